@@ -0,0 +1,96 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
+def normalize_question(question: str) -> str:
+    """Case-, whitespace- and trailing-punctuation-insensitive form of a question"""
+    return _WHITESPACE_RE.sub(' ', question.lower()).strip().rstrip('?!. ')
+
+
+class AnswerCache:
+    """Two-tier cache of chatbot answers.
+
+    Keys combine the normalized question, a fingerprint of the loaded
+    content and the model parameters (including a hash of the conversation
+    history in the prompt), so an answer is only reused for the same
+    question over the same corpus, conversation and settings. The first
+    tier is an in-memory LRU; the optional second tier is a SQLite file
+    whose entries expire after ``ttl`` seconds.
+    """
+
+    def __init__(self, max_entries: int = 512, path: Optional[str] = None,
+                 ttl: float = 24 * 3600):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._memory: 'OrderedDict[str, str]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = None
+        if path:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS answers (
+                    key TEXT PRIMARY KEY,
+                    answer TEXT NOT NULL,
+                    stored_at REAL NOT NULL
+                )
+            """)
+            self._conn.execute("DELETE FROM answers WHERE stored_at < ?", (time.time() - ttl,))
+            self._conn.commit()
+
+    @staticmethod
+    def make_key(question: str, content_fingerprint: str, params: Dict) -> str:
+        payload = json.dumps([normalize_question(question), content_fingerprint, params],
+                             sort_keys=True)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            answer = self._memory.get(key)
+            if answer is not None:
+                self._memory.move_to_end(key)
+                return answer
+            if self._conn is None:
+                return None
+            row = self._conn.execute("SELECT answer, stored_at FROM answers WHERE key = ?",
+                                     (key,)).fetchone()
+        if row is None or time.time() - row[1] > self.ttl:
+            return None
+        self._remember(key, row[0])
+        return row[0]
+
+    def put(self, key: str, answer: str):
+        self._remember(key, answer)
+        if self._conn is not None:
+            with self._lock:
+                self._conn.execute("INSERT OR REPLACE INTO answers VALUES (?, ?, ?)",
+                                   (key, answer, time.time()))
+                self._conn.commit()
+
+    def _remember(self, key: str, answer: str):
+        with self._lock:
+            self._memory[key] = answer
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            if self._conn is not None:
+                self._conn.execute("DELETE FROM answers")
+                self._conn.commit()
+
+    def __len__(self) -> int:
+        return len(self._memory)
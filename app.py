@@ -1,8 +1,13 @@
 import streamlit as st
 from scraper import WebScraper
-from chatbot import WebChatbot
+from chatbot import WebChatbot, INVALID_KEY_MESSAGE
+from http_cache import ResponseCache
+from answer_cache import AnswerCache
+from resources import get_http_session
+from pdf_ingest import iter_parse_pdfs, PdfParseCache
+from crawl_state import CrawlStateStore
+from result_store import SqliteResultStore
 import os
-from PyPDF2 import PdfReader
 
 # Page config
 st.set_page_config(
@@ -310,11 +315,70 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+@st.cache_resource
+def get_response_cache():
+    """One on-disk response cache shared by all sessions of this process"""
+    return ResponseCache()
+
+@st.cache_resource
+def get_answer_cache():
+    """Answers shared by all sessions; keys include a fingerprint of the loaded content"""
+    return AnswerCache(path=os.path.join('.cache', 'answer_cache.sqlite'))
+
+@st.cache_resource
+def get_crawl_state():
+    """Checkpoints of deep scrapes, so an interrupted crawl can be resumed"""
+    return CrawlStateStore()
+
+@st.cache_resource
+def get_pdf_cache():
+    """Parsed PDF text shared by all sessions, keyed by a hash of the file bytes"""
+    return PdfParseCache()
+
+def replace_scraped_data(store):
+    """Swap in a new result store, deleting the previous one's temporary file"""
+    st.session_state.scraped_data.close()
+    st.session_state.scraped_data = store
+
+def collect_results(results, expected_pages, label):
+    """Store and index pages as the scraper yields them, with a progress bar and
+    a live list of the latest pages. Replaces the session's earlier results up
+    front, so pages finished before an interruption are kept.
+    Returns (store, number of successful pages)."""
+    scraped_data = SqliteResultStore()
+    replace_scraped_data(scraped_data)
+    chatbot = st.session_state.chatbot if st.session_state.api_key_valid else None
+    if chatbot:
+        chatbot.add_scraped_content([])
+    
+    progress = st.progress(0.0, text=label)
+    latest = st.empty()
+    recent = []
+    success_count = 0
+    for done, item in enumerate(results, start=1):
+        scraped_data.append(item)
+        # Index each page as it arrives so the chatbot is ready when the crawl ends
+        if chatbot:
+            chatbot.upsert_documents([item])
+        if item['status'] == 'success':
+            success_count += 1
+        status_icon = "✅" if item['status'] == 'success' else "❌"
+        if item.get('duplicate_of'):
+            status_icon = "♻️"
+        recent = [f"{status_icon} {item['title'] or item['url']}"] + recent[:4]
+        progress.progress(min(done / max(expected_pages, 1), 1.0),
+                          text=f"{label}: {done} pages, {success_count} successful")
+        latest.markdown('\n'.join(f"- {line}" for line in recent))
+    progress.empty()
+    latest.empty()
+    return scraped_data, success_count
+
 # Initialize session state
 if 'chatbot' not in st.session_state:
     st.session_state.chatbot = None
 if 'scraped_data' not in st.session_state:
-    st.session_state.scraped_data = []
+    # Results live in a per-session SQLite file; the session only holds the handle
+    st.session_state.scraped_data = SqliteResultStore()
 if 'chat_history' not in st.session_state:
     st.session_state.chat_history = []
 if 'api_key_valid' not in st.session_state:
@@ -359,12 +423,24 @@ with st.sidebar:
             st.markdown('<div class="error-card">❌ OpenAI API keys should start with "sk-"</div>', unsafe_allow_html=True)
             st.session_state.api_key_valid = False
         else:
-            # Try to initialize chatbot to test the key
+            # Initialize the chatbot without blocking on a network probe: the key is
+            # checked on a background thread and the result is cached for the process
             try:
-                if st.session_state.chatbot is None or not st.session_state.api_key_valid:
-                    st.session_state.chatbot = WebChatbot(api_key=api_key)
+                if (st.session_state.chatbot is None or not st.session_state.api_key_valid or
+                        st.session_state.chatbot.api_key != api_key):
+                    st.session_state.chatbot = WebChatbot(api_key=api_key, answer_cache=get_answer_cache(),
+                                                          validate="background")
+                    # A new chatbot starts empty; give it the pages this session already has
+                    st.session_state.chatbot.add_scraped_content(list(st.session_state.scraped_data))
                     st.session_state.api_key_valid = True
+                
+                key_status = st.session_state.chatbot.key_status
+                if key_status == "invalid":
+                    raise ValueError(INVALID_KEY_MESSAGE)
+                if key_status == "valid":
                     st.markdown('<div class="success-card">✅ API key validated successfully!</div>', unsafe_allow_html=True)
+                else:
+                    st.markdown('<div class="info-card">🔑 API key accepted; it is being verified in the background</div>', unsafe_allow_html=True)
             except ValueError as e:
                 st.markdown(f'<div class="error-card">❌ {str(e)}</div>', unsafe_allow_html=True)
                 st.session_state.api_key_valid = False
@@ -394,43 +470,23 @@ with st.sidebar:
         help="Uploaded PDFs will be parsed and included in the analysis and chat context."
     )
 
-    def _parse_pdf_files(files):
-        parsed_items = []
-        for file in files:
-            try:
-                reader = PdfReader(file)
-                text_chunks = []
-                for page in reader.pages:
-                    try:
-                        text_chunks.append(page.extract_text() or "")
-                    except Exception:
-                        continue
-                full_text = "\n".join(text_chunks)
-                title = os.path.splitext(os.path.basename(file.name))[0]
-                parsed_items.append({
-                    'url': f"uploaded://{file.name}",
-                    'title': title,
-                    'content': full_text[:10000],
-                    'status': 'success'
-                })
-            except Exception as e:
-                parsed_items.append({
-                    'url': f"uploaded://{getattr(file, 'name', 'unknown')}",
-                    'title': 'PDF Parse Error',
-                    'content': '',
-                    'status': f'error: {str(e)}'
-                })
-        return parsed_items
-
     if uploaded_pdfs:
         if st.button("📥 Add Uploaded PDFs"):
             with st.spinner("Parsing uploaded PDFs..."):
-                pdf_items = _parse_pdf_files(uploaded_pdfs)
-                # Merge into scraped_data
-                st.session_state.scraped_data = (st.session_state.scraped_data or []) + pdf_items
-                # Add to chatbot if available
+                # Files (and page ranges of large files) are parsed on a process pool
+                pdf_files = [(file.name, file.getvalue()) for file in uploaded_pdfs]
+                progress = st.progress(0.0)
+                pdf_items = []
+                for item in iter_parse_pdfs(pdf_files, cache=get_pdf_cache()):
+                    pdf_items.append(item)
+                    progress.progress(len(pdf_items) / len(pdf_files),
+                                      text=f"Parsed {len(pdf_items)}/{len(pdf_files)} PDF(s)")
+                progress.empty()
+                # Add to scraped_data; re-adding a PDF replaces its earlier entry
+                st.session_state.scraped_data.extend(pdf_items)
+                # Add only the new documents to the chatbot if available
                 if st.session_state.chatbot and st.session_state.api_key_valid:
-                    st.session_state.chatbot.add_scraped_content(st.session_state.scraped_data)
+                    st.session_state.chatbot.upsert_documents(pdf_items)
                 success_count = sum(1 for item in pdf_items if item['status'] == 'success')
                 st.success(f"Added {success_count}/{len(pdf_items)} PDF(s) to analysis.")
     
@@ -445,6 +501,10 @@ with st.sidebar:
         with col2:
             max_pages = st.slider("Maximum pages", 5, 50, 10, 
                                  help="Limit total pages to prevent excessive scraping")
+            max_workers = st.slider("Parallel requests", 1, 8, 4,
+                                   help="Pages fetched at once during deep scraping; the delay still applies per website")
+            skip_duplicate_links = st.checkbox("Skip links on duplicate pages", value=False,
+                                               help="Don't follow links found on pages whose content duplicates an earlier page (e.g. print views, sort orders)")
             st.info("💡 Higher depth and page limits will take longer but provide more comprehensive analysis.")
     
     # Scraping buttons
@@ -454,54 +514,67 @@ with st.sidebar:
             if not urls_input.strip():
                 st.error("Please enter at least one URL!")
             else:
-                urls = [url.strip() for url in urls_input.split('\n') if url.strip()]
+                urls = list(dict.fromkeys(url.strip() for url in urls_input.split('\n') if url.strip()))
                 
-                with st.spinner("Scraping websites..."):
-                    scraper = WebScraper(delay=scrape_delay)
-                    scraped_data = scraper.scrape_multiple_urls(urls)
-                    
-                    st.session_state.scraped_data = scraped_data
-                    
-                    # Add content to chatbot if available
-                    if st.session_state.chatbot and st.session_state.api_key_valid:
-                        st.session_state.chatbot.add_scraped_content(scraped_data)
-                    
-                    # Show scraping results
-                    success_count = sum(1 for item in scraped_data if item['status'] == 'success')
-                    st.success(f"Successfully scraped {success_count}/{len(scraped_data)} websites!")
+                scraper = WebScraper(delay=scrape_delay, cache=get_response_cache(),
+                                     session=get_http_session())
+                # Results are shown, stored and indexed as each page finishes
+                scraped_data, success_count = collect_results(
+                    scraper.iter_scrape_multiple_urls(urls), len(urls), "Scraping websites")
+                
+                # Show scraping results
+                st.success(f"Successfully scraped {success_count}/{len(scraped_data)} websites!")
     
     with col2:
-        if st.button("🕷️ Deep Scrape (Multi-Level)"):
+        # A deep scrape of the same URLs that was interrupted (e.g. by a restart) can be continued;
+        # crawls still running in other sessions are not offered
+        input_urls = [url.strip() for url in urls_input.split('\n') if url.strip()]
+        interrupted = next((crawl for crawl in get_crawl_state().unfinished_crawls()
+                            if crawl['start_urls'] == input_urls), None)
+        deep_scrape = st.button("🕷️ Deep Scrape (Multi-Level)")
+        resume_scrape = interrupted is not None and st.button(
+            f"↩️ Resume Deep Scrape ({interrupted['pages_done']} pages done)")
+        if deep_scrape or resume_scrape:
             if not urls_input.strip():
                 st.error("Please enter at least one URL!")
             else:
-                urls = [url.strip() for url in urls_input.split('\n') if url.strip()]
+                urls = input_urls
                 
-                with st.spinner(f"Deep scraping websites (depth {scrape_depth})..."):
-                    scraper = WebScraper(delay=scrape_delay, max_pages=max_pages)
-                    scraped_data = scraper.scrape_with_depth(urls, depth=scrape_depth)
-                    
-                    st.session_state.scraped_data = scraped_data
-                    
-                    # Add content to chatbot if available
-                    if st.session_state.chatbot and st.session_state.api_key_valid:
-                        st.session_state.chatbot.add_scraped_content(scraped_data)
+                scraper = WebScraper(delay=scrape_delay, max_pages=max_pages, max_workers=max_workers,
+                                     cache=get_response_cache(), session=get_http_session(),
+                                     state_store=get_crawl_state(),
+                                     skip_duplicate_links=skip_duplicate_links)
+                # Pages are written to disk, shown and indexed as they finish
+                pages = None
+                if resume_scrape:
+                    try:
+                        pages = scraper.iter_resume(interrupted['crawl_id'])
+                    except ValueError:
+                        # Another session took the crawl over since this page was drawn
+                        st.warning("This deep scrape is already being resumed in another session.")
+                    expected_pages = interrupted['max_pages']
+                else:
+                    pages = scraper.iter_scrape_with_depth(urls, depth=scrape_depth)
+                    expected_pages = max_pages
+                if pages is not None:
+                    scraped_data, success_count = collect_results(
+                        pages, expected_pages, f"Deep scraping websites (depth {scrape_depth})")
                     
                     # Show scraping results with stats
-                    success_count = sum(1 for item in scraped_data if item['status'] == 'success')
                     stats = scraper.get_scraping_stats()
                     
                     st.success(f"Deep scraping completed!")
                     st.info(f"📊 **Stats:** {success_count} successful pages, "
                            f"Max depth: {stats['max_depth_configured']}, "
-                           f"Total discovered: {stats['total_urls_visited']}")
+                           f"Total discovered: {stats['total_urls_visited']}, "
+                           f"Duplicates (left out of chat): {stats['duplicate_pages']}")
                     
                     if not st.session_state.api_key_valid:
                         st.info("💡 Add your OpenAI API key to enable AI chat about this content!")
     
     # Clear data button
     if st.button("🗑️ Clear All Data"):
-        st.session_state.scraped_data = []
+        st.session_state.scraped_data.clear()
         st.session_state.chat_history = []
         st.session_state.chatbot.clear_history()
         st.success("All data cleared!")
@@ -513,11 +586,14 @@ with col1:
     st.markdown('<div class="content-section">', unsafe_allow_html=True)
     st.markdown("### 📄 Content Analysis")
     
+    # Summaries carry a short preview but not the page text, so listing stays cheap
+    summaries = st.session_state.scraped_data.summaries()
+    
     # Show stats if data exists
-    if st.session_state.scraped_data:
-        total_pages = len(st.session_state.scraped_data)
-        successful_pages = sum(1 for item in st.session_state.scraped_data if item['status'] == 'success')
-        max_depth = max((item.get('depth', 0) for item in st.session_state.scraped_data), default=0)
+    if summaries:
+        total_pages = len(summaries)
+        successful_pages = sum(1 for item in summaries if item['status'] == 'success')
+        max_depth = max((item.get('depth', 0) for item in summaries), default=0)
         
         st.markdown(f"""
         <div class="stats-container">
@@ -536,8 +612,8 @@ with col1:
         </div>
         """, unsafe_allow_html=True)
     
-    if st.session_state.scraped_data:
-        for i, item in enumerate(st.session_state.scraped_data):
+    if summaries:
+        for i, item in enumerate(summaries):
             # Create title with depth indicator
             depth_indicator = f" • Level {item.get('depth', 0)}" if 'depth' in item else ""
             title_display = item['title'][:60] + "..." if len(item['title']) > 60 else item['title']
@@ -552,17 +628,19 @@ with col1:
                     if 'depth' in item:
                         st.markdown(f"**📊 Analysis Level:** {item['depth']}")
                 with col_b:
-                    if item['status'] == 'success':
+                    if item.get('duplicate_of'):
+                        st.markdown(f'<div class="info-card">♻️ Duplicate of {item["duplicate_of"]}</div>', unsafe_allow_html=True)
+                    elif item['status'] == 'success':
                         st.markdown('<div class="success-card">✅ Successfully analyzed</div>', unsafe_allow_html=True)
                     else:
                         st.markdown(f'<div class="error-card">❌ {item["status"]}</div>', unsafe_allow_html=True)
                 
                 if item['status'] == 'success':
                     st.markdown("**📝 Content Preview:**")
-                    st.markdown(f'<div class="info-card">{item["content"][:400]}...</div>', unsafe_allow_html=True)
+                    st.markdown(f'<div class="info-card">{item["preview"]}...</div>', unsafe_allow_html=True)
                     
-                    if 'links' in item and item['links']:
-                        st.markdown(f"**🔗 Discovered Links:** {len(item['links'])} additional pages found")
+                    if item['link_count']:
+                        st.markdown(f"**🔗 Discovered Links:** {item['link_count']} additional pages found")
     else:
         st.markdown("""
         <div class="info-card">
@@ -635,22 +713,33 @@ with col2:
                 st.session_state.chat_history[-2]['content'] == question if len(st.session_state.chat_history) >= 2 else False):
                 st.warning("⚠️ This question was just asked. Please try a different question to avoid loops.")
             else:
-                with st.spinner("🤔 Thinking..."):
-                    answer = st.session_state.chatbot.ask_question(question)
-                    
-                    # Add to chat history only if we got a valid response
-                    if not answer.startswith("❌"):
-                        st.session_state.chat_history.append({
-                            'role': 'user',
-                            'content': question
-                        })
-                        st.session_state.chat_history.append({
-                            'role': 'assistant',
-                            'content': answer
-                        })
-                    else:
-                        # Show error but don't add to history
-                        st.error(answer)
+                # Render the answer token by token as it streams in
+                answer_placeholder = st.empty()
+                streamed = ""
+                for delta in st.session_state.chatbot.ask_question_stream(question):
+                    streamed += delta
+                    answer_placeholder.markdown(f"""
+                    <div class="assistant-message">
+                        <strong>🤖 AI Assistant:</strong>
+                        <div class="chat-message-content">{streamed}</div>
+                    </div>
+                    """, unsafe_allow_html=True)
+                answer = st.session_state.chatbot.last_answer
+                
+                # Add to chat history only if we got a valid response
+                if not answer.startswith("❌"):
+                    st.session_state.chat_history.append({
+                        'role': 'user',
+                        'content': question
+                    })
+                    st.session_state.chat_history.append({
+                        'role': 'assistant',
+                        'content': answer
+                    })
+                else:
+                    # Show error but don't add to history
+                    answer_placeholder.empty()
+                    st.error(answer)
                 
                 # Rerun to update the display
                 st.rerun()
@@ -0,0 +1,232 @@
+import asyncio
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+from crawl_state import CrawlStateStore
+from frontier import CrawlFrontier
+from host_scheduler import HostScheduler
+from http_cache import ResponseCache
+from instrumentation import incr, span
+from scraper import BaseScraper, USER_AGENT
+
+
+class AsyncWebScraper(BaseScraper):
+    """asyncio counterpart of WebScraper built on aiohttp.
+
+    scrape_url, scrape_multiple_urls and scrape_with_depth are coroutines
+    returning the same result dicts as WebScraper. At most ``concurrency``
+    pages are in flight overall and at most ``per_host_limit`` connections
+    are open to any one host; the politeness delay is applied per host.
+    iter_scrape_multiple_urls, iter_scrape_with_depth and iter_resume are async
+    generators yielding results as pages finish.
+
+    Use it as an async context manager, or call ``close()`` when done::
+
+        async with AsyncWebScraper(delay=0.5) as scraper:
+            results = await scraper.scrape_with_depth(urls, depth=2)
+    """
+
+    def __init__(self, delay: float = 1.0, max_depth: int = 1, max_pages: int = 10,
+                 concurrency: int = 50, per_host_limit: int = 4, respect_robots: bool = True,
+                 cache: Optional[ResponseCache] = None, parser_backend: Optional[str] = None,
+                 max_bytes: int = 2 * 1024 * 1024, state_store: Optional[CrawlStateStore] = None,
+                 detect_duplicates: bool = True, skip_duplicate_links: bool = False):
+        if aiohttp is None:
+            raise ImportError("AsyncWebScraper requires aiohttp. Install it with: pip install aiohttp")
+        super().__init__(delay=delay, max_depth=max_depth, max_pages=max_pages, cache=cache,
+                         parser_backend=parser_backend, max_bytes=max_bytes,
+                         state_store=state_store, detect_duplicates=detect_duplicates,
+                         skip_duplicate_links=skip_duplicate_links)
+        self.concurrency = max(1, concurrency)
+        self.per_host_limit = max(1, per_host_limit)
+        # robots.txt lookups are rare and go through a small blocking session on a thread
+        self.scheduler = HostScheduler(delay=delay, user_agent=USER_AGENT,
+                                       respect_robots=respect_robots)
+        self._session: Optional['aiohttp.ClientSession'] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    async def __aenter__(self) -> 'AsyncWebScraper':
+        self._ensure_session()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    def _ensure_session(self) -> 'aiohttp.ClientSession':
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.concurrency, limit_per_host=self.per_host_limit,
+                                             ssl=False)
+            self._session = aiohttp.ClientSession(connector=connector,
+                                                  headers={'User-Agent': USER_AGENT},
+                                                  timeout=aiohttp.ClientTimeout(total=10))
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        return self._session
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def _wait_for_host(self, url: str):
+        """Wait for the host's politeness slot without blocking the event loop"""
+        if not self.scheduler.knows_host(url):
+            await asyncio.to_thread(self.scheduler.host_delay, url)
+        remaining = self.scheduler.reserve(url)
+        if remaining > 0:
+            await asyncio.sleep(remaining)
+
+    async def _fetch(self, url: str) -> Tuple[bytes, str]:
+        """Async equivalent of WebScraper._fetch: conditional, streamed and capped at max_bytes"""
+        session = self._ensure_session()
+        cached = self.cache.get(url) if self.cache else None
+        headers = ResponseCache.conditional_headers(cached)
+
+        async with session.get(url, headers=headers) as response:
+            if cached and response.status == 304:
+                self.cache.touch(url)
+                incr('fetch.not_modified', collector=self.timings)
+                return cached['body'], cached['content_type']
+
+            response.raise_for_status()
+
+            content_type = response.headers.get('Content-Type', '')
+            self._check_content_type(content_type)
+
+            chunks = []
+            received = 0
+            with span('fetch.body', self.timings):
+                async for chunk in response.content.iter_chunked(64 * 1024):
+                    chunks.append(chunk)
+                    received += len(chunk)
+                    if received >= self.max_bytes:
+                        break
+            body = b''.join(chunks)[:self.max_bytes]
+            incr('fetch.bytes', len(body), collector=self.timings)
+
+        if self.cache:
+            self.cache.put(url, body,
+                           etag=response.headers.get('ETag'),
+                           last_modified=response.headers.get('Last-Modified'),
+                           content_type=content_type)
+        return body, content_type
+
+    async def scrape_url(self, url: str, extract_links: bool = False,
+                         depth: Optional[int] = None) -> Dict[str, str]:
+        """Scrape content from a single URL"""
+        self._ensure_session()
+        async with self._semaphore:
+            try:
+                normalized_url = self._normalize_url(url)
+                with span('fetch', self.timings):
+                    body, content_type = await self._fetch(normalized_url)
+                # Parsing is CPU work; keep it off the event loop
+                return await asyncio.to_thread(self._build_result, url, normalized_url, body,
+                                               extract_links, depth, content_type)
+            except Exception as e:
+                return self._error_result(url, e, extract_links)
+
+    async def _scrape_politely(self, url: str, extract_links: bool = False,
+                               depth: Optional[int] = None) -> Dict[str, str]:
+        await self._wait_for_host(url)
+        return await self.scrape_url(url, extract_links=extract_links, depth=depth)
+
+    async def scrape_multiple_urls(self, urls: List[str]) -> List[Dict[str, str]]:
+        """Scrape content from multiple URLs (single level only); results keep input order"""
+        unique_urls = list(dict.fromkeys(urls))
+        results = await asyncio.gather(*(self._scrape_politely(url) for url in unique_urls))
+        self._reset_duplicates()
+        for result in results:
+            self._mark_duplicate(result)
+        results_by_url = dict(zip(unique_urls, results))
+        return [results_by_url[url] for url in urls]
+
+    async def iter_scrape_multiple_urls(self, urls: List[str]) -> AsyncIterator[Dict[str, str]]:
+        """Like scrape_multiple_urls, but yields each result as soon as it is fetched"""
+        self._reset_duplicates()
+        tasks = [asyncio.ensure_future(self._scrape_politely(url)) for url in dict.fromkeys(urls)]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                result = await next_done
+                self._mark_duplicate(result)
+                yield result
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def _crawl_page(self, url: str, depth: int) -> Dict[str, str]:
+        result = await self._scrape_politely(url, extract_links=depth < self.max_depth, depth=depth)
+        result['depth'] = depth
+        return result
+
+    async def scrape_with_depth(self, start_urls: List[str], depth: int = 2,
+                                crawl_id: Optional[str] = None, result_store=None) -> List[Dict[str, str]]:
+        """Scrape URLs with specified depth level, keeping up to `concurrency` pages in flight.
+        With a state_store the crawl is checkpointed under crawl_id (see resume).
+        Results go to result_store, if given, as they finish."""
+        results = result_store if result_store is not None else []
+        async for result in self.iter_scrape_with_depth(start_urls, depth, crawl_id):
+            results.append(result)
+        return results
+
+    def iter_scrape_with_depth(self, start_urls: List[str], depth: int = 2,
+                               crawl_id: Optional[str] = None) -> AsyncIterator[Dict[str, str]]:
+        """Async generator version of scrape_with_depth: yields each page's result
+        as soon as it finishes. Closing it early cancels the pages in flight."""
+        frontier = self._start_crawl(start_urls, depth, crawl_id)
+        return self._iter_crawl(frontier)
+
+    async def resume(self, crawl_id: str, result_store=None) -> List[Dict[str, str]]:
+        """Continue an interrupted depth crawl from the state store"""
+        results = result_store if result_store is not None else []
+        async for result in self.iter_resume(crawl_id):
+            results.append(result)
+        return results
+
+    def iter_resume(self, crawl_id: str) -> AsyncIterator[Dict[str, str]]:
+        """Async generator version of resume: stored results first, then new ones.
+        Raises ValueError at once if the crawl is still running elsewhere."""
+        frontier = self._resume_crawl(crawl_id)
+        return self._iter_resumed(crawl_id, frontier)
+
+    async def _iter_resumed(self, crawl_id: str, frontier: CrawlFrontier) -> AsyncIterator[Dict[str, str]]:
+        try:
+            for result in self.state_store.iter_results(crawl_id):
+                self._mark_duplicate(result)
+                yield result
+        except BaseException:
+            self._interrupt_crawl()
+            raise
+        async for result in self._iter_crawl(frontier):
+            yield result
+
+    async def _iter_crawl(self, frontier: CrawlFrontier) -> AsyncIterator[Dict[str, str]]:
+        in_flight = {}
+        try:
+            while frontier or in_flight:
+                while (frontier and len(in_flight) < self.concurrency and
+                       self.scraped_count < self.max_pages):
+                    current_url, current_depth = self._take_next(frontier)
+                    task = asyncio.ensure_future(self._crawl_page(current_url, current_depth))
+                    in_flight[task] = current_depth
+
+                if not in_flight:
+                    break
+
+                done, _ = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    current_depth = in_flight.pop(task)
+                    result = task.result()
+                    self._finish_page(frontier, result, current_depth)
+                    yield result
+        except BaseException:
+            self._interrupt_crawl()
+            raise
+        finally:
+            for task in in_flight:
+                task.cancel()
+
+        self._end_crawl()
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Crawler benchmark against a generated local site (no network access needed)
+
+A fixture HTTP server is started in a child process and serves a site of
+--pages pages, each linking to --fanout child pages, padded to about
+--page-kb kilobytes, with --latency-ms of simulated server latency.
+scrape_url, scrape_multiple_urls and scrape_with_depth are run against it
+and the script reports pages/sec, CPU per page, peak Python memory and how
+much time went to the network, HTML parsing and link handling (from the
+scraper's instrumentation spans).
+
+    python bench_crawl.py --pages 200 --fanout 5 --page-kb 20 --latency-ms 20
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import multiprocessing
+import time
+import tracemalloc
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import instrumentation
+from scraper import WebScraper
+
+WORDS = ('crawler', 'budget', 'latency', 'python', 'service', 'network', 'parser', 'index',
+         'token', 'chunk', 'frontier', 'politeness', 'header', 'response', 'content', 'page')
+
+
+def build_site(pages: int, fanout: int, page_kb: int):
+    """Generated pages keyed by path. Page i links to its children i*fanout+1 ...
+    i*fanout+fanout, so a depth crawl from / reaches every page."""
+    site = {}
+    for number in range(pages):
+        children = [child for child in range(number * fanout + 1, number * fanout + fanout + 1)
+                    if child < pages]
+        links = ''.join(f'<li><a href="/page/{child}">Page {child}</a></li>' for child in children)
+        nav = '<nav><a href="/">Home</a> <a href="/page/1">About us</a></nav>'
+        head = (f'<html><head><title>Fixture page {number}</title>'
+                f'<style>body {{ font-family: sans-serif; }}</style></head><body>{nav}'
+                f'<h1>Fixture page {number}</h1><ul>{links}</ul>')
+        tail = '<script>var tracker = 1;</script></body></html>'
+        paragraphs = []
+        size = len(head) + len(tail)
+        line = 0
+        while size < page_kb * 1024:
+            words = ' '.join(WORDS[(number + line + i) % len(WORDS)] for i in range(40))
+            paragraph = f'<p>{words}.</p>\n'
+            paragraphs.append(paragraph)
+            size += len(paragraph)
+            line += 1
+        site['/' if number == 0 else f'/page/{number}'] = (head + ''.join(paragraphs) + tail).encode('utf-8')
+    return site
+
+
+def _serve(pages: int, fanout: int, page_kb: int, latency: float, conn):
+    site = build_site(pages, fanout, page_kb)
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        # Headers and body go out as separate writes; don't let Nagle hold the body back
+        disable_nagle_algorithm = True
+
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            if latency:
+                time.sleep(latency)
+            body = site.get(self.path)
+            if body is None:
+                self.send_response(404)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/html; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    server.daemon_threads = True
+    conn.send(server.server_address[1])
+    server.serve_forever()
+
+
+def start_fixture_server(pages: int, fanout: int, page_kb: int, latency: float):
+    """Start the fixture site in a child process; returns (base URL, process)"""
+    parent_conn, child_conn = multiprocessing.Pipe()
+    process = multiprocessing.Process(target=_serve, args=(pages, fanout, page_kb, latency, child_conn),
+                                      daemon=True)
+    process.start()
+    port = parent_conn.recv()
+    return f'http://127.0.0.1:{port}', process
+
+
+def run_scenario(name: str, make_scraper, run, measure_memory: bool):
+    """Run one scenario (timing pass, then an optional tracemalloc pass) and
+    return its measurements"""
+    scraper = make_scraper()
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    results = run(scraper)
+    wall = time.perf_counter() - wall_start
+    cpu = time.process_time() - cpu_start
+
+    pages = len(results)
+    ok = sum(1 for result in results if result['status'] == 'success')
+    report = {
+        'scenario': name,
+        'pages': pages,
+        'ok': ok,
+        'seconds': round(wall, 3),
+        'pages_per_sec': round(pages / wall, 1) if wall else 0.0,
+        'cpu_ms_per_page': round(1000 * cpu / pages, 2) if pages else 0.0,
+        'network_s': round(scraper.timings.total('fetch'), 3),
+        'parse_s': round(scraper.timings.total('parse'), 3),
+        'links_s': round(scraper.timings.total('normalize') + scraper.timings.total('links'), 3),
+        'peak_mem_mb': None
+    }
+
+    if measure_memory:
+        # Separate pass: tracemalloc slows allocation-heavy code and would skew the timings
+        scraper = make_scraper()
+        tracemalloc.start()
+        run(scraper)
+        report['peak_mem_mb'] = round(tracemalloc.get_traced_memory()[1] / (1024 * 1024), 2)
+        tracemalloc.stop()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--pages', type=int, default=200, help='pages in the generated site')
+    parser.add_argument('--fanout', type=int, default=5, help='child links per page')
+    parser.add_argument('--page-kb', type=int, default=20, help='approximate page size in KB')
+    parser.add_argument('--latency-ms', type=float, default=20, help='server latency per request')
+    parser.add_argument('--workers', type=int, default=8, help='max_workers for scrape_with_depth')
+    parser.add_argument('--depth', type=int, default=4, help='depth for scrape_with_depth')
+    parser.add_argument('--single', type=int, default=25, help='pages fetched one by one with scrape_url')
+    parser.add_argument('--backend', default=None, help='HTML parser backend (selectolax, lxml, bs4)')
+    parser.add_argument('--no-memory', action='store_true', help='skip the tracemalloc pass')
+    parser.add_argument('--json', action='store_true', help='print results as JSON')
+    args = parser.parse_args()
+
+    # Feeds each scraper's timings, from which the phase totals are read
+    instrumentation.enable()
+    base_url, server = start_fixture_server(args.pages, args.fanout, args.page_kb,
+                                            args.latency_ms / 1000)
+    urls = [f'{base_url}/'] + [f'{base_url}/page/{number}' for number in range(1, args.pages)]
+
+    def make_scraper(max_workers: int = 1):
+        return WebScraper(delay=0, max_pages=args.pages, max_workers=max_workers,
+                          respect_robots=False, parser_backend=args.backend)
+
+    scenarios = [
+        ('scrape_url', make_scraper,
+         lambda scraper: [scraper.scrape_url(url) for url in urls[:args.single]]),
+        ('scrape_multiple_urls', make_scraper,
+         lambda scraper: scraper.scrape_multiple_urls(urls)),
+        ('scrape_with_depth', lambda: make_scraper(args.workers),
+         lambda scraper: scraper.scrape_with_depth([urls[0]], depth=args.depth)),
+    ]
+
+    reports = []
+    try:
+        # The scraper's progress prints would drown the report
+        with contextlib.redirect_stdout(io.StringIO()):
+            for name, factory, run in scenarios:
+                reports.append(run_scenario(name, factory, run, measure_memory=not args.no_memory))
+    finally:
+        server.terminate()
+
+    if args.json:
+        print(json.dumps({'config': vars(args), 'results': reports}, indent=2))
+        return
+
+    print(f"🏁 Crawl benchmark: {args.pages} pages, fan-out {args.fanout}, ~{args.page_kb} KB/page, "
+          f"{args.latency_ms:g} ms latency")
+    print("=" * 108)
+    print(f"{'scenario':<22}{'pages':>7}{'ok':>6}{'secs':>9}{'pages/s':>10}{'cpu ms/pg':>11}"
+          f"{'network s':>11}{'parse s':>10}{'links s':>9}{'peak MB':>10}")
+    for report in reports:
+        peak = '-' if report['peak_mem_mb'] is None else f"{report['peak_mem_mb']:.2f}"
+        print(f"{report['scenario']:<22}{report['pages']:>7}{report['ok']:>6}{report['seconds']:>9.2f}"
+              f"{report['pages_per_sec']:>10.1f}{report['cpu_ms_per_page']:>11.2f}"
+              f"{report['network_s']:>11.2f}{report['parse_s']:>10.2f}{report['links_s']:>9.2f}{peak:>10}")
+    print("\nnetwork/parse/links are summed over worker threads, so they can exceed the wall time.")
+
+
+if __name__ == "__main__":
+    main()
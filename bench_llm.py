@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""
+Offline chatbot benchmark against a local OpenAI-compatible stub server
+
+The stub implements GET /v1/models and POST /v1/chat/completions (streaming
+and non-streaming) with configurable latency, token rate and error
+injection. WebChatbot is pointed at it through base_url, so no API key or
+network is needed. For each corpus size the script reports index build
+time, prompt tokens, context assembly and retrieval time, end-to-end latency percentiles
+and throughput.
+
+    python bench_llm.py --corpus 10 100 1000 --questions 30 --latency-ms 150 --tokens-per-sec 80
+"""
+
+import argparse
+import json
+import multiprocessing
+import random
+import statistics
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import instrumentation
+from answer_cache import AnswerCache
+from chatbot import WebChatbot
+
+# Requests with this key get a 401, to exercise the authentication path
+INVALID_KEY = 'sk-bench-invalid'
+
+VOCABULARY = ('pricing', 'support', 'shipping', 'warranty', 'install', 'python', 'release',
+              'security', 'account', 'billing', 'api', 'limits', 'region', 'backup', 'upgrade',
+              'license', 'team', 'invoice', 'refund', 'latency', 'export', 'import', 'plugin',
+              'schedule', 'report', 'dashboard', 'alert', 'mobile', 'desktop', 'storage')
+
+
+def _serve(latency: float, tokens_per_sec: float, answer_tokens: int, error_rate: float,
+           seed: int, conn):
+    rng = random.Random(seed)
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        disable_nagle_algorithm = True
+
+        def log_message(self, *args):
+            pass
+
+        def _send_json(self, status: int, payload: dict):
+            body = json.dumps(payload).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _authorized(self) -> bool:
+            if self.headers.get('Authorization', '') == f'Bearer {INVALID_KEY}':
+                self._send_json(401, {'error': {'message': 'Incorrect API key provided',
+                                                'type': 'invalid_request_error',
+                                                'code': 'invalid_api_key'}})
+                return False
+            return True
+
+        def do_GET(self):
+            if not self._authorized():
+                return
+            if self.path.rstrip('/').endswith('/models'):
+                self._send_json(200, {'object': 'list', 'data': [
+                    {'id': 'gpt-3.5-turbo', 'object': 'model', 'created': 0, 'owned_by': 'bench'}]})
+            else:
+                self._send_json(404, {'error': {'message': 'not found'}})
+
+        def do_POST(self):
+            length = int(self.headers.get('Content-Length', 0))
+            request = json.loads(self.rfile.read(length) or b'{}')
+            if not self._authorized():
+                return
+            if not self.path.rstrip('/').endswith('/chat/completions'):
+                self._send_json(404, {'error': {'message': 'not found'}})
+                return
+            if latency:
+                time.sleep(latency)
+            if error_rate and rng.random() < error_rate:
+                self._send_json(500, {'error': {'message': 'injected failure', 'type': 'server_error'}})
+                return
+
+            prompt_chars = sum(len(message.get('content') or '') for message in request['messages'])
+            tokens = min(answer_tokens, request.get('max_tokens') or answer_tokens)
+            words = [VOCABULARY[(prompt_chars + i) % len(VOCABULARY)] for i in range(tokens)]
+            usage = {'prompt_tokens': prompt_chars // 4, 'completion_tokens': tokens,
+                     'total_tokens': prompt_chars // 4 + tokens}
+            base = {'id': 'chatcmpl-bench', 'created': int(time.time()), 'model': request.get('model')}
+
+            if not request.get('stream'):
+                if tokens_per_sec:
+                    time.sleep(tokens / tokens_per_sec)
+                self._send_json(200, dict(base, object='chat.completion', usage=usage, choices=[{
+                    'index': 0, 'finish_reason': 'stop',
+                    'message': {'role': 'assistant', 'content': ' '.join(words)}}]))
+                return
+
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/event-stream')
+            self.send_header('Transfer-Encoding', 'chunked')
+            self.end_headers()
+
+            def send_event(payload):
+                data = f"data: {payload}\n\n".encode('utf-8')
+                self.wfile.write(f"{len(data):x}\r\n".encode('ascii') + data + b"\r\n")
+                self.wfile.flush()
+
+            for index, word in enumerate(words):
+                if tokens_per_sec:
+                    time.sleep(1 / tokens_per_sec)
+                delta = {'content': word if index == 0 else ' ' + word}
+                send_event(json.dumps(dict(base, object='chat.completion.chunk', choices=[
+                    {'index': 0, 'delta': delta, 'finish_reason': None}])))
+            send_event(json.dumps(dict(base, object='chat.completion.chunk', choices=[
+                {'index': 0, 'delta': {}, 'finish_reason': 'stop'}])))
+            send_event('[DONE]')
+            self.wfile.write(b"0\r\n\r\n")
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    server.daemon_threads = True
+    conn.send(server.server_address[1])
+    server.serve_forever()
+
+
+def start_stub_server(latency: float, tokens_per_sec: float, answer_tokens: int,
+                      error_rate: float, seed: int = 0):
+    """Start the stub in a child process; returns (base_url, process)"""
+    parent_conn, child_conn = multiprocessing.Pipe()
+    process = multiprocessing.Process(
+        target=_serve, args=(latency, tokens_per_sec, answer_tokens, error_rate, seed, child_conn),
+        daemon=True)
+    process.start()
+    port = parent_conn.recv()
+    return f'http://127.0.0.1:{port}/v1', process
+
+
+def make_corpus(pages: int, words_per_page: int, seed: int = 0):
+    """Synthetic scraped pages, shaped like scraper results"""
+    rng = random.Random(seed)
+    corpus = []
+    for number in range(pages):
+        words = ' '.join(rng.choice(VOCABULARY) for _ in range(words_per_page))
+        corpus.append({
+            'url': f'https://bench.example/page/{number}',
+            'title': f'Bench page {number}',
+            'content': words,
+            'status': 'success'
+        })
+    return corpus
+
+
+def make_questions(count: int, seed: int = 1):
+    rng = random.Random(seed)
+    return [f"What does the site say about {rng.choice(VOCABULARY)} and {rng.choice(VOCABULARY)} "
+            f"(question {number})?" for number in range(count)]
+
+
+def percentile(values, fraction: float) -> float:
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def run_corpus(base_url: str, pages: int, args) -> dict:
+    corpus = make_corpus(pages, args.words_per_page)
+    # max_entries=0 disables the answer cache so every question reaches the stub
+    chatbot = WebChatbot(api_key='sk-bench', base_url=base_url, validate='lazy',
+                         answer_cache=AnswerCache(max_entries=0))
+
+    start = time.perf_counter()
+    chatbot.add_scraped_content(corpus)
+    index_seconds = time.perf_counter() - start
+
+    latencies, first_tokens, prompt_tokens, errors = [], [], [], 0
+    run_start = time.perf_counter()
+    for question in make_questions(args.questions):
+        start = time.perf_counter()
+        if args.stream:
+            first = None
+            for _ in chatbot.ask_question_stream(question):
+                if first is None:
+                    first = time.perf_counter() - start
+            answer = chatbot.last_answer
+            first_tokens.append(first or 0.0)
+        else:
+            answer = chatbot.ask_question(question)
+        latencies.append(time.perf_counter() - start)
+        prompt_tokens.append(chatbot.last_prompt_tokens.get('total', 0))
+        if answer.startswith('❌'):
+            errors += 1
+    run_seconds = time.perf_counter() - run_start
+    timings = chatbot.timings.summary()
+
+    report = {
+        'pages': pages,
+        'chunks': len(chatbot.index),
+        'index_s': round(index_seconds, 3),
+        'prompt_tokens_mean': round(statistics.mean(prompt_tokens)) if prompt_tokens else 0,
+        'context_ms_mean': timings.get('context', {}).get('mean_ms', 0.0),
+        'retrieve_ms_mean': timings.get('retrieve', {}).get('mean_ms', 0.0),
+        'p50_ms': round(1000 * percentile(latencies, 0.5), 1),
+        'p90_ms': round(1000 * percentile(latencies, 0.9), 1),
+        'p99_ms': round(1000 * percentile(latencies, 0.99), 1),
+        'questions_per_sec': round(len(latencies) / run_seconds, 2) if run_seconds else 0.0,
+        'errors': errors
+    }
+    if args.stream:
+        report['ttft_p50_ms'] = round(1000 * percentile(first_tokens, 0.5), 1)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--corpus', type=int, nargs='+', default=[10, 100, 1000],
+                        help='corpus sizes (pages) to benchmark')
+    parser.add_argument('--words-per-page', type=int, default=600)
+    parser.add_argument('--questions', type=int, default=30, help='questions per corpus size')
+    parser.add_argument('--latency-ms', type=float, default=150, help='stub latency before answering')
+    parser.add_argument('--tokens-per-sec', type=float, default=80, help='stub generation speed (0 = instant)')
+    parser.add_argument('--answer-tokens', type=int, default=60, help='tokens in each stub answer')
+    parser.add_argument('--error-rate', type=float, default=0.0,
+                        help='fraction of completions that fail with HTTP 500')
+    parser.add_argument('--stream', action='store_true', help='use ask_question_stream')
+    parser.add_argument('--json', action='store_true', help='print results as JSON')
+    args = parser.parse_args()
+
+    # Feeds each chatbot's timings, from which context and retrieval times are read
+    instrumentation.enable()
+    base_url, server = start_stub_server(args.latency_ms / 1000, args.tokens_per_sec,
+                                         args.answer_tokens, args.error_rate)
+    try:
+        reports = [run_corpus(base_url, pages, args) for pages in args.corpus]
+    finally:
+        server.terminate()
+
+    if args.json:
+        print(json.dumps({'config': vars(args), 'results': reports}, indent=2))
+        return
+
+    print(f"🏁 Chatbot benchmark: {args.questions} questions per corpus, stub latency {args.latency_ms:g} ms, "
+          f"{args.tokens_per_sec:g} tok/s, error rate {args.error_rate:g}"
+          f"{', streaming' if args.stream else ''}")
+    print("=" * 122)
+    header = (f"{'pages':>7}{'chunks':>8}{'index s':>9}{'prompt tok':>12}{'context ms':>12}{'retrieve ms':>13}"
+              f"{'p50 ms':>9}{'p90 ms':>9}{'p99 ms':>9}{'q/s':>7}{'errors':>8}")
+    if args.stream:
+        header += f"{'ttft ms':>9}"
+    print(header)
+    for report in reports:
+        line = (f"{report['pages']:>7}{report['chunks']:>8}{report['index_s']:>9.2f}"
+                f"{report['prompt_tokens_mean']:>12}{report['context_ms_mean']:>12.2f}"
+                f"{report['retrieve_ms_mean']:>13.2f}"
+                f"{report['p50_ms']:>9.1f}{report['p90_ms']:>9.1f}{report['p99_ms']:>9.1f}"
+                f"{report['questions_per_sec']:>7.2f}{report['errors']:>8}")
+        if args.stream:
+            line += f"{report['ttft_p50_ms']:>9.1f}"
+        print(line)
+    print("\nFailed requests are retried by the OpenAI client, so injected errors show up as latency "
+          "first and as errors only when every retry fails.")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,58 @@
 import openai
-from typing import List, Dict
+from typing import Dict, Iterator, List, Optional
+import hashlib
+import json
 import os
+import threading
+import time
 from dotenv import load_dotenv
+from retrieval import BM25Index
+from prompt_budget import PromptBudget, TokenCounter, pack, REPLY_PRIMING
+from answer_cache import AnswerCache
+from documents import document_hash
+from resources import get_openai_client
+from instrumentation import MemorySink, incr, record, span
 
 load_dotenv()
 
+INVALID_KEY_MESSAGE = "Invalid OpenAI API key. Please check your key at https://platform.openai.com/account/api-keys"
+AUTH_ERROR_ANSWER = f"❌ Authentication Error: {INVALID_KEY_MESSAGE}"
+
+# Process-wide API key validation results, keyed by SHA-256 of the key and endpoint:
+# 'valid' or 'invalid'
+_key_status: Dict[str, str] = {}
+_key_status_lock = threading.Lock()
+
+
+def _key_hash(api_key: str, base_url: Optional[str] = None) -> str:
+    return hashlib.sha256(f"{api_key}\0{base_url or ''}".encode('utf-8')).hexdigest()
+
+
+def cached_key_status(api_key: str, base_url: Optional[str] = None) -> Optional[str]:
+    """'valid' or 'invalid' if this process has already checked the key, else None"""
+    with _key_status_lock:
+        return _key_status.get(_key_hash(api_key, base_url))
+
+
+def _record_key_status(api_key: str, status: str, base_url: Optional[str] = None):
+    with _key_status_lock:
+        _key_status[_key_hash(api_key, base_url)] = status
+
+SYSTEM_PROMPT = "You are a helpful assistant that answers questions based on website content provided to you. Use only the information from the websites to answer questions. If the information is not available in the provided content, say so clearly. Do not repeat the user's question verbatim. Keep answers concise."
+
 class WebChatbot:
-    def __init__(self, api_key: str = None):
+    def __init__(self, api_key: str = None, model: str = "gpt-3.5-turbo",
+                 budget: PromptBudget = None, answer_cache: AnswerCache = None,
+                 validate: str = "eager", base_url: str = None):
+        """base_url points the client at an OpenAI-compatible endpoint other than
+        api.openai.com (defaults to the OPENAI_BASE_URL environment variable).
+
+        validate controls how the API key is checked:
+        - "eager": a blocking models.list() probe now (raises ValueError if invalid)
+        - "background": the probe runs on a daemon thread; see key_status
+        - "lazy": no probe; the first real request validates the key
+        Results are cached per key for the whole process, so only the first
+        chatbot created with a given key ever pays for a probe."""
         # Get API key from parameter, environment, or .env file
         self.api_key = api_key or os.getenv('OPENAI_API_KEY')
         
@@ -16,108 +62,339 @@ class WebChatbot:
         if self.api_key.startswith('your_') or self.api_key == 'your_openai_api_key_here':
             raise ValueError("Please replace the placeholder API key with your actual OpenAI API key.")
         
+        if validate not in ("eager", "background", "lazy"):
+            raise ValueError(f"Unknown validate mode: {validate}")
+        
+        self.base_url = base_url or os.getenv('OPENAI_BASE_URL') or None
+        
         try:
-            self.client = openai.OpenAI(api_key=self.api_key)
-            # Test the API key with a simple request
-            self._test_api_key()
+            # Shared with every other chatbot using this key, so connections stay warm
+            self.client = get_openai_client(self.api_key, self.base_url)
+            # A key already known to be invalid fails fast in every mode
+            if cached_key_status(self.api_key, self.base_url) == "invalid":
+                raise ValueError(INVALID_KEY_MESSAGE)
+            if validate == "eager":
+                # Test the API key with a simple request
+                self._test_api_key()
+            elif validate == "background" and cached_key_status(self.api_key, self.base_url) is None:
+                threading.Thread(target=self._probe_key_quietly, daemon=True).start()
         except Exception as e:
             raise ValueError(f"Failed to initialize OpenAI client: {str(e)}")
         
-        self.scraped_content = []
+        # Knowledge base keyed by URL. Only a small record of each document is kept
+        # (see _document_record); its text lives in the index as chunks.
+        self._documents: Dict[str, Dict[str, str]] = {}
+        self._fingerprint = None
         self.conversation_history = []
+        # Lexical index over chunked page content
+        self.index = BM25Index()
+        self._retrieval_candidates = 30  # ranked chunks considered for the prompt per question
+        # Token accounting for prompt assembly
+        self.model = model
+        self.temperature = 0.7
+        self.budget = budget or PromptBudget()
+        self.token_counter = TokenCounter(model)
+        self.last_prompt_tokens: Dict[str, int] = {}
+        # Span timings of this chatbot, collected while instrumentation is enabled
+        self.timings = MemorySink()
+        # Answers to repeated questions over the same content and settings
+        # (compared with None: an empty shared cache is falsy)
+        self.answer_cache = answer_cache if answer_cache is not None else AnswerCache()
+        # Final text of the last streamed answer (after the duplicate-answer guard)
+        self.last_answer = ""
         # Loop prevention controls
         self._max_history_messages = 6  # messages to include in prompt (excludes system)
         self._max_total_messages = 20   # cap stored history size
     
     def _test_api_key(self):
-        """Test if the API key is valid"""
+        """Test if the API key is valid (skipped when this process already knows)"""
+        status = cached_key_status(self.api_key, self.base_url)
+        if status == "valid":
+            return
+        if status == "invalid":
+            raise ValueError(INVALID_KEY_MESSAGE)
         try:
             # Make a minimal request to test the key
             self.client.models.list()
+            _record_key_status(self.api_key, "valid", self.base_url)
         except openai.AuthenticationError:
-            raise ValueError("Invalid OpenAI API key. Please check your key at https://platform.openai.com/account/api-keys")
+            _record_key_status(self.api_key, "invalid", self.base_url)
+            raise ValueError(INVALID_KEY_MESSAGE)
         except Exception as e:
             # Other errors are okay for now, we just want to test authentication
             pass
     
+    def _probe_key_quietly(self):
+        try:
+            self._test_api_key()
+        except ValueError:
+            pass
+    
+    def _mark_key_valid(self):
+        """A request succeeded, so the key works (lazy validation on first use)"""
+        if self.key_status != "valid":
+            _record_key_status(self.api_key, "valid", self.base_url)
+    
+    @property
+    def key_status(self) -> str:
+        """'valid', 'invalid' or 'unknown' (not checked yet, or the check is still running)"""
+        return cached_key_status(self.api_key, self.base_url) or "unknown"
+    
+    @property
+    def scraped_content(self) -> List[Dict[str, str]]:
+        """Records (url, title, status, hash and duplicate_of) of the documents
+        currently in the knowledge base"""
+        return list(self._documents.values())
+    
+    @staticmethod
+    def _document_record(item: Dict[str, str]) -> Dict[str, str]:
+        """What the knowledge base keeps of a document: enough to tell whether it
+        changed and to fingerprint the corpus, without its content or links"""
+        record = {'url': item['url'], 'title': item['title'], 'status': item['status'],
+                  'hash': document_hash(item)}
+        if item.get('duplicate_of'):
+            record['duplicate_of'] = item['duplicate_of']
+        return record
+    
+    def upsert_documents(self, items: List[Dict[str, str]]):
+        """Add documents, replacing any already loaded under the same URL.
+        Only the given documents are (re)indexed."""
+        for item in items:
+            record = self._document_record(item)
+            previous = self._documents.get(item['url'])
+            if previous is not None and previous['hash'] == record['hash']:
+                continue
+            self._documents[item['url']] = record
+            self._fingerprint = None
+            # Near-duplicates of another page (see near_duplicates.py) stay out of the
+            # index so the same text is not sent to the model twice
+            if item['status'] == 'success' and not item.get('duplicate_of'):
+                self.index.add_page(item)
+            else:
+                self.index.remove_page(item['url'])
+    
+    # Adding and upserting are the same operation for a URL-keyed knowledge base
+    add_documents = upsert_documents
+    
+    def remove_documents(self, urls: List[str]):
+        """Remove documents (and their indexed chunks) by URL"""
+        for url in urls:
+            if self._documents.pop(url, None) is not None:
+                self._fingerprint = None
+                self.index.remove_page(url)
+    
+    def content_fingerprint(self) -> str:
+        """Hash identifying the loaded corpus; recomputed only after it changes"""
+        if self._fingerprint is None:
+            digest = hashlib.sha256()
+            for url in sorted(self._documents):
+                digest.update(f"{url}\0{self._documents[url]['hash']}\n".encode('utf-8'))
+            self._fingerprint = digest.hexdigest()
+        return self._fingerprint
+    
+    def _history_fingerprint(self) -> str:
+        """Hash of the history that _build_messages puts in the prompt; follow-up
+        questions depend on it"""
+        history, _ = self.budget.fit_history(
+            self.conversation_history, self.token_counter, max_messages=self._max_history_messages)
+        payload = json.dumps([[message['role'], message['content']] for message in history])
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+    
+    def _answer_cache_key(self, question: str) -> str:
+        params = {
+            'history': self._history_fingerprint(),
+            'model': self.model,
+            'temperature': self.temperature,
+            'answer_tokens': self.budget.answer_tokens,
+            'content_tokens': self.budget.content_tokens,
+            'system_prompt': SYSTEM_PROMPT
+        }
+        return AnswerCache.make_key(question, self.content_fingerprint(), params)
+    
     def add_scraped_content(self, content: List[Dict[str, str]]):
-        """Add scraped content to the chatbot's knowledge base"""
-        self.scraped_content = content
+        """Replace the knowledge base with the given content.
+        Only documents that were added, changed or dropped are reindexed."""
+        new_urls = {item['url'] for item in content}
+        self.remove_documents([url for url in self._documents if url not in new_urls])
+        self.upsert_documents(content)
+    
+    def _retrieve(self, question: str) -> List[Dict]:
+        """Chunks ranked by relevance to the question; leading chunks of each page
+        fill in when few chunks match"""
+        with span('retrieve', self.timings):
+            hits = self.index.search(question, k=self._retrieval_candidates)
+            if len(hits) < self._retrieval_candidates:
+                seen = {hit['id'] for hit in hits}
+                hits += self.index.leading_chunks(self._retrieval_candidates - len(hits), exclude=seen)
+        return hits
     
-    def _prepare_context(self) -> str:
-        """Prepare context from scraped content"""
-        if not self.scraped_content:
+    @staticmethod
+    def _format_chunk(chunk: Dict) -> str:
+        return f"Title: {chunk['title']}\nURL: {chunk['url']}\nContent: {chunk['text']}\n\n"
+    
+    def _prepare_context(self, question: str = "", max_tokens: int = None) -> str:
+        """Prepare context from the scraped content chunks relevant to the question,
+        packed greedily in relevance order up to max_tokens"""
+        if not len(self.index):
             return "No website content available."
         
-        context = "Based on the following website content:\n\n"
-        for item in self.scraped_content:
-            if item['status'] == 'success':
-                context += f"Title: {item['title']}\n"
-                context += f"URL: {item['url']}\n"
-                context += f"Content: {item['content'][:2000]}...\n\n"
+        if max_tokens is None:
+            max_tokens = self.budget.content_tokens
+        header = "Based on the following website content:\n\n"
+        # The context span includes the nested retrieve span
+        with span('context', self.timings):
+            entries = [self._format_chunk(chunk) for chunk in self._retrieve(question)]
+            chosen, _ = pack(entries, self.token_counter, max_tokens - self.token_counter.count(header))
+        
+        return header + ''.join(entries[index] for index in chosen)
+    
+    def _build_messages(self, question: str) -> List[Dict[str, str]]:
+        """Assemble the prompt within the token budget: system prompt, the most
+        recent history that fits, then retrieved content and the question"""
+        counter = self.token_counter
+        system_message = {"role": "system", "content": SYSTEM_PROMPT}
+        history, history_tokens = self.budget.fit_history(
+            self.conversation_history, counter, max_messages=self._max_history_messages)
+        question_suffix = f"\n\nQuestion: {question}"
+        
+        used = (counter.count_message(system_message) + history_tokens +
+                counter.count_message({"content": question_suffix}) + REPLY_PRIMING)
+        context = self._prepare_context(question, self.budget.content_allowance(used))
+        
+        # Start with system message, then history BEFORE the current question
+        messages = [system_message] + history
+        # Add the current question with context
+        messages.append({"role": "user", "content": f"{context}{question_suffix}"})
+        
+        self.last_prompt_tokens = {
+            'history': history_tokens,
+            'content': counter.count(context),
+            'total': counter.count_messages(messages),
+            'answer_budget': self.budget.answer_tokens
+        }
+        return messages
+    
+    def _record_answer(self, question: str, answer: str) -> str:
+        """Apply the duplicate-answer guard and append the turn to the history"""
+        # Avoid echoing identical assistant reply as last message
+        last_assistant = [m for m in self.conversation_history if m["role"] == "assistant"]
+        if last_assistant and answer == (last_assistant[-1]["content"] or "").strip():
+            return "⚠️ I just provided this answer. Try refining your question or asking from a different angle."
+        
+        # Update conversation history AFTER getting the response
+        self.conversation_history.append({"role": "user", "content": question})
+        self.conversation_history.append({"role": "assistant", "content": answer})
+        
+        # Trim stored history to prevent unbounded growth
+        if len(self.conversation_history) > self._max_total_messages:
+            self.conversation_history = self.conversation_history[-self._max_total_messages:]
         
-        return context
+        return answer
+    
+    def _is_repeat_question(self, question: str) -> bool:
+        """Prevent immediate repeat-question loops"""
+        recent_user = [m for m in self.conversation_history if m["role"] == "user"]
+        return bool(recent_user) and question.strip() == (recent_user[-1]["content"] or "").strip()
+    
+    def _error_message(self, error: Exception) -> str:
+        incr('llm.errors', collector=self.timings, error=type(error).__name__)
+        if isinstance(error, openai.AuthenticationError):
+            _record_key_status(self.api_key, "invalid", self.base_url)
+            return AUTH_ERROR_ANSWER
+        if isinstance(error, openai.RateLimitError):
+            return "❌ Rate Limit Error: You've exceeded your API quota. Please check your OpenAI billing."
+        if isinstance(error, openai.APIError):
+            return f"❌ OpenAI API Error: {str(error)}"
+        return f"❌ Unexpected Error: {str(error)}"
     
     def ask_question(self, question: str) -> str:
         """Ask a question about the scraped content"""
         try:
-            # Prevent immediate repeat-question loops
-            if self.conversation_history:
-                recent_user = [m for m in self.conversation_history if m["role"] == "user"]
-                if recent_user and question.strip() == (recent_user[-1]["content"] or "").strip():
-                    return "⚠️ This question was just asked. Please rephrase or ask a different question."
+            if self._is_repeat_question(question):
+                return "⚠️ This question was just asked. Please rephrase or ask a different question."
+            if self.key_status == "invalid":
+                return AUTH_ERROR_ANSWER
 
-            context = self._prepare_context()
-            
-            # Start with system message
-            messages = [
-                {
-                    "role": "system",
-                    "content": "You are a helpful assistant that answers questions based on website content provided to you. Use only the information from the websites to answer questions. If the information is not available in the provided content, say so clearly. Do not repeat the user's question verbatim. Keep answers concise."
-                }
-            ]
-            
-            # Add conversation history BEFORE the current question (keep last configured messages)
-            messages.extend(self.conversation_history[-self._max_history_messages:])
+            cache_key = self._answer_cache_key(question)
+            answer = self.answer_cache.get(cache_key)
+            if answer is None:
+                messages = self._build_messages(question)
+                
+                with span('llm', self.timings):
+                    response = self.client.chat.completions.create(
+                        model=self.model,
+                        messages=messages,
+                        max_tokens=self.budget.answer_tokens,
+                        temperature=self.temperature
+                    )
+                
+                self._mark_key_valid()
+                answer = (response.choices[0].message.content or "").strip()
+                if answer:
+                    self.answer_cache.put(cache_key, answer)
+            else:
+                incr('answer_cache.hits', collector=self.timings)
             
-            # Add the current question with context
-            messages.append({
-                "role": "user",
-                "content": f"{context}\n\nQuestion: {question}"
-            })
+            return self._record_answer(question, answer)
             
-            response = self.client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=messages,
-                max_tokens=500,
-                temperature=0.7
-            )
-            
-            answer = (response.choices[0].message.content or "").strip()
-
-            # Avoid echoing identical assistant reply as last message
-            last_assistant = [m for m in self.conversation_history if m["role"] == "assistant"]
-            if last_assistant and answer == (last_assistant[-1]["content"] or "").strip():
-                return "⚠️ I just provided this answer. Try refining your question or asking from a different angle."
-            
-            # Update conversation history AFTER getting the response
-            self.conversation_history.append({"role": "user", "content": question})
-            self.conversation_history.append({"role": "assistant", "content": answer})
-            
-            # Trim stored history to prevent unbounded growth
-            if len(self.conversation_history) > self._max_total_messages:
-                self.conversation_history = self.conversation_history[-self._max_total_messages:]
-            
-            return answer
+        except Exception as e:
+            return self._error_message(e)
+    
+    def ask_question_stream(self, question: str) -> Iterator[str]:
+        """Streaming variant of ask_question: yields answer text as it arrives.
+        
+        The duplicate-answer guard and history trimming run once the answer is
+        complete; the final text (which may be a warning instead of the streamed
+        answer) is stored in last_answer and is also the generator's return value.
+        Errors are yielded as a single "❌ ..." message, as ask_question returns them.
+        """
+        self.last_answer = ""
+        if self._is_repeat_question(question):
+            self.last_answer = "⚠️ This question was just asked. Please rephrase or ask a different question."
+        elif self.key_status == "invalid":
+            self.last_answer = AUTH_ERROR_ANSWER
+        if self.last_answer:
+            yield self.last_answer
+            return self.last_answer
+        
+        try:
+            cache_key = self._answer_cache_key(question)
+            answer = self.answer_cache.get(cache_key)
+            if answer is not None:
+                incr('answer_cache.hits', collector=self.timings)
+                yield answer
+            else:
+                messages = self._build_messages(question)
+                parts = []
+                # Covers the whole stream, including time the consumer holds each piece
+                with span('llm', self.timings):
+                    start = time.perf_counter()
+                    stream = self.client.chat.completions.create(
+                        model=self.model,
+                        messages=messages,
+                        max_tokens=self.budget.answer_tokens,
+                        temperature=self.temperature,
+                        stream=True
+                    )
+                    
+                    self._mark_key_valid()
+                    for chunk in stream:
+                        delta = chunk.choices[0].delta.content if chunk.choices else None
+                        if delta:
+                            if not parts:
+                                record('llm.first_token', time.perf_counter() - start, self.timings)
+                            parts.append(delta)
+                            yield delta
+                
+                answer = ''.join(parts).strip()
+                if answer:
+                    self.answer_cache.put(cache_key, answer)
             
-        except openai.AuthenticationError:
-            return "❌ Authentication Error: Invalid OpenAI API key. Please check your key at https://platform.openai.com/account/api-keys"
-        except openai.RateLimitError:
-            return "❌ Rate Limit Error: You've exceeded your API quota. Please check your OpenAI billing."
-        except openai.APIError as e:
-            return f"❌ OpenAI API Error: {str(e)}"
+            self.last_answer = self._record_answer(question, answer)
         except Exception as e:
-            return f"❌ Unexpected Error: {str(e)}"
+            self.last_answer = self._error_message(e)
+            yield self.last_answer
+        return self.last_answer
     
     def clear_history(self):
         """Clear conversation history"""
@@ -126,9 +403,11 @@ class WebChatbot:
     def test_conversation_flow(self) -> bool:
         """Test method to verify conversation flow works without loops"""
         try:
-            # Save current state
+            # Save current state; the knowledge base is set aside rather than copied,
+            # since it keeps no document text to reload from
             original_history = self.conversation_history.copy()
-            original_content = self.scraped_content.copy()
+            original_state = (self._documents, self.index, self._fingerprint)
+            self._documents, self.index, self._fingerprint = {}, BM25Index(), None
             
             # Set test content
             test_content = [{
@@ -160,7 +439,7 @@ class WebChatbot:
             
             # Restore original state
             self.conversation_history = original_history
-            self.scraped_content = original_content
+            self._documents, self.index, self._fingerprint = original_state
             
             return test_passed
             
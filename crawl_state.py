@@ -0,0 +1,254 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+# Seconds without a checkpoint after which a running crawl counts as abandoned
+STALE_AFTER = 120
+
+
+class CrawlStateStore:
+    """Persistent state of depth crawls, backed by SQLite.
+
+    For every crawl it records the configuration, the frontier, the visited
+    pages, the results and per-host politeness state. The scraper checkpoints
+    after every page it takes and every result it finishes, so an
+    interrupted crawl can be resumed without fetching completed pages again.
+    Pages that were in flight when the crawl stopped go back to the
+    frontier.
+
+    The store may be shared by several scrapers (e.g. all sessions of the
+    app), so a running crawl holds a lease that every checkpoint renews. A
+    crawl can only be resumed once it was stopped ('interrupted') or has not
+    checkpointed for ``stale_after`` seconds, e.g. because its process died.
+    Crawls untouched for ``ttl`` seconds are pruned, finished or not.
+    """
+
+    def __init__(self, path: str = os.path.join('.cache', 'crawl_state.sqlite'),
+                 ttl: float = 7 * 24 * 3600, stale_after: float = STALE_AFTER):
+        self.path = path
+        self.ttl = ttl
+        self.stale_after = stale_after
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS crawls (
+                crawl_id TEXT PRIMARY KEY,
+                start_urls TEXT NOT NULL,
+                max_depth INTEGER NOT NULL,
+                max_pages INTEGER NOT NULL,
+                status TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS frontier (
+                crawl_id TEXT NOT NULL,
+                url TEXT NOT NULL,
+                depth INTEGER NOT NULL,
+                seq INTEGER NOT NULL,
+                PRIMARY KEY (crawl_id, url)
+            );
+            CREATE TABLE IF NOT EXISTS visited (
+                crawl_id TEXT NOT NULL,
+                url TEXT NOT NULL,
+                depth INTEGER NOT NULL,
+                done INTEGER NOT NULL,
+                PRIMARY KEY (crawl_id, url)
+            );
+            CREATE TABLE IF NOT EXISTS results (
+                crawl_id TEXT NOT NULL,
+                seq INTEGER NOT NULL,
+                url TEXT NOT NULL,
+                result TEXT NOT NULL,
+                PRIMARY KEY (crawl_id, seq)
+            );
+            CREATE TABLE IF NOT EXISTS hosts (
+                crawl_id TEXT NOT NULL,
+                host TEXT NOT NULL,
+                delay REAL NOT NULL,
+                next_allowed REAL NOT NULL,
+                PRIMARY KEY (crawl_id, host)
+            );
+        """)
+        self._conn.commit()
+        self.prune()
+
+    def start_crawl(self, crawl_id: str, start_urls: List[str], max_depth: int, max_pages: int):
+        """Register a crawl, discarding any earlier state stored under the same id"""
+        now = time.time()
+        with self._lock:
+            self._delete(crawl_id)
+            self._conn.execute("INSERT INTO crawls VALUES (?, ?, ?, ?, 'running', ?, ?)",
+                               (crawl_id, json.dumps(start_urls), max_depth, max_pages, now, now))
+            self._conn.commit()
+
+    def is_unfinished(self, crawl_id: str) -> bool:
+        with self._lock:
+            row = self._conn.execute("SELECT status FROM crawls WHERE crawl_id = ?",
+                                     (crawl_id,)).fetchone()
+        return row is not None and row[0] != 'done'
+
+    def unfinished_crawls(self) -> List[Dict]:
+        """Crawls that were started but never finished and can be resumed now,
+        most recent first. Crawls still running elsewhere are left out."""
+        with self._lock:
+            rows = self._conn.execute("""
+                SELECT c.crawl_id, c.start_urls, c.max_depth, c.max_pages, c.updated_at,
+                       (SELECT COUNT(*) FROM visited v WHERE v.crawl_id = c.crawl_id AND v.done = 1)
+                FROM crawls c
+                WHERE c.status = 'interrupted' OR (c.status = 'running' AND c.updated_at < ?)
+                ORDER BY c.updated_at DESC
+            """, (time.time() - self.stale_after,)).fetchall()
+        return [{
+            'crawl_id': row[0],
+            'start_urls': json.loads(row[1]),
+            'max_depth': row[2],
+            'max_pages': row[3],
+            'updated_at': row[4],
+            'pages_done': row[5]
+        } for row in rows]
+
+    def record_pushed(self, crawl_id: str, entries: Iterable[Tuple[str, int]]):
+        """URLs added to the frontier"""
+        with self._lock:
+            self._add_frontier(crawl_id, entries)
+            self._conn.commit()
+
+    def record_taken(self, crawl_id: str, url: str, depth: int):
+        """A URL left the frontier and is being fetched"""
+        with self._lock:
+            self._conn.execute("DELETE FROM frontier WHERE crawl_id = ? AND url = ?", (crawl_id, url))
+            self._conn.execute("INSERT OR REPLACE INTO visited VALUES (?, ?, ?, 0)",
+                               (crawl_id, url, depth))
+            self._touch(crawl_id)
+            self._conn.commit()
+
+    def record_result(self, crawl_id: str, result: Dict, pushed: Iterable[Tuple[str, int]] = (),
+                      hosts: Optional[Dict[str, Dict[str, float]]] = None):
+        """A page finished: store its result, the links it queued and its host's
+        politeness state in one transaction"""
+        with self._lock:
+            seq = self._conn.execute("SELECT COALESCE(MAX(seq), -1) + 1 FROM results WHERE crawl_id = ?",
+                                     (crawl_id,)).fetchone()[0]
+            self._conn.execute("INSERT INTO results VALUES (?, ?, ?, ?)",
+                               (crawl_id, seq, result['url'], json.dumps(result)))
+            self._conn.execute("UPDATE visited SET done = 1 WHERE crawl_id = ? AND url = ?",
+                               (crawl_id, result['url']))
+            self._add_frontier(crawl_id, pushed)
+            for host, state in (hosts or {}).items():
+                self._conn.execute("INSERT OR REPLACE INTO hosts VALUES (?, ?, ?, ?)",
+                                   (crawl_id, host, state['delay'], state['next_allowed']))
+            self._touch(crawl_id)
+            self._conn.commit()
+
+    def interrupt_crawl(self, crawl_id: str):
+        """Give up the lease of a crawl that stopped early, so it can be resumed at once"""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE crawls SET status = 'interrupted', updated_at = ? WHERE crawl_id = ? AND status = 'running'",
+                (time.time(), crawl_id))
+            self._conn.commit()
+
+    def finish_crawl(self, crawl_id: str):
+        with self._lock:
+            self._conn.execute("UPDATE crawls SET status = 'done', updated_at = ? WHERE crawl_id = ?",
+                               (time.time(), crawl_id))
+            self._conn.commit()
+
+    def load(self, crawl_id: str) -> Dict:
+        """Take over a crawl and return everything needed to resume it except
+        the stored results (see iter_results). Pages that were taken but never
+        finished are moved back to the frontier first. Raises ValueError if the
+        crawl is still running elsewhere."""
+        with self._lock:
+            crawl = self._conn.execute(
+                "SELECT start_urls, max_depth, max_pages, status FROM crawls WHERE crawl_id = ?",
+                (crawl_id,)).fetchone()
+            if crawl is None:
+                raise KeyError(f"unknown crawl {crawl_id}")
+            if crawl[3] != 'done':
+                # Claim the lease in one statement, so two resumes cannot both get it
+                now = time.time()
+                claimed = self._conn.execute("""
+                    UPDATE crawls SET status = 'running', updated_at = ?
+                    WHERE crawl_id = ? AND (status = 'interrupted' OR updated_at < ?)
+                """, (now, crawl_id, now - self.stale_after)).rowcount
+                if not claimed:
+                    raise ValueError(f"crawl {crawl_id} is still running")
+
+            interrupted = self._conn.execute(
+                "SELECT url, depth FROM visited WHERE crawl_id = ? AND done = 0", (crawl_id,)).fetchall()
+            self._conn.execute("DELETE FROM visited WHERE crawl_id = ? AND done = 0", (crawl_id,))
+            self._add_frontier(crawl_id, interrupted)
+            self._conn.commit()
+
+            frontier = self._conn.execute(
+                "SELECT url, depth FROM frontier WHERE crawl_id = ? ORDER BY seq", (crawl_id,)).fetchall()
+            visited = [row[0] for row in self._conn.execute(
+                "SELECT url FROM visited WHERE crawl_id = ?", (crawl_id,))]
+            hosts = {row[0]: {'delay': row[1], 'next_allowed': row[2]} for row in self._conn.execute(
+                "SELECT host, delay, next_allowed FROM hosts WHERE crawl_id = ?", (crawl_id,))}
+        return {
+            'crawl_id': crawl_id,
+            'start_urls': json.loads(crawl[0]),
+            'max_depth': crawl[1],
+            'max_pages': crawl[2],
+            'status': crawl[3],
+            'frontier': frontier,
+            'visited': visited,
+            'hosts': hosts
+        }
+
+    def iter_results(self, crawl_id: str, batch_size: int = 64) -> Iterator[Dict]:
+        """Stored results of a crawl in the order they finished, read in batches"""
+        last_seq = -1
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT seq, result FROM results WHERE crawl_id = ? AND seq > ? ORDER BY seq LIMIT ?",
+                    (crawl_id, last_seq, batch_size)).fetchall()
+            if not rows:
+                return
+            for seq, result in rows:
+                last_seq = seq
+                yield json.loads(result)
+
+    def delete_crawl(self, crawl_id: str):
+        with self._lock:
+            self._delete(crawl_id)
+            self._conn.commit()
+
+    def prune(self):
+        """Drop crawls untouched for ttl: finished ones and abandoned unfinished ones"""
+        with self._lock:
+            old = [row[0] for row in self._conn.execute(
+                "SELECT crawl_id FROM crawls WHERE updated_at < ?", (time.time() - self.ttl,))]
+            for crawl_id in old:
+                self._delete(crawl_id)
+            self._conn.commit()
+
+    def _touch(self, crawl_id: str):
+        # Renews the lease of a running crawl
+        self._conn.execute("UPDATE crawls SET updated_at = ? WHERE crawl_id = ?", (time.time(), crawl_id))
+
+    def _add_frontier(self, crawl_id: str, entries: Iterable[Tuple[str, int]]):
+        seq = self._conn.execute("SELECT COALESCE(MAX(seq), -1) + 1 FROM frontier WHERE crawl_id = ?",
+                                 (crawl_id,)).fetchone()[0]
+        self._conn.executemany("INSERT OR IGNORE INTO frontier VALUES (?, ?, ?, ?)",
+                               [(crawl_id, url, depth, seq + i) for i, (url, depth) in enumerate(entries)])
+
+    def _delete(self, crawl_id: str):
+        for table in ('crawls', 'frontier', 'visited', 'results', 'hosts'):
+            self._conn.execute(f"DELETE FROM {table} WHERE crawl_id = ?", (crawl_id,))
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,159 @@
+"""Document and chunk model.
+
+A scraped page or uploaded PDF is kept as a result dict whose full text is
+held as a list of chunks::
+
+    {'url', 'title', 'content', 'status', 'length', 'chunks': [chunk, ...]}
+
+``content`` is only a preview of the first PREVIEW_CHARS characters. Each
+chunk is a dict::
+
+    {'id', 'url', 'depth', 'start', 'end', 'text'}
+
+``start``/``end`` are offsets into the document text. ``id`` is derived
+from the URL and the chunk's position, so it stays the same each time the
+same page is scraped. Chunks are cut while the text is still being
+extracted, so the full text never has to be built.
+"""
+
+import hashlib
+from typing import Dict, Iterable, List, Optional
+
+# Target chunk length and the overlap repeated between neighbouring chunks
+CHUNK_SIZE = 800
+CHUNK_OVERLAP = 100
+# Characters of the document kept in 'content' for previews and display
+PREVIEW_CHARS = 10000
+
+
+def chunk_id(url: str, index: int) -> str:
+    """Stable id of the index-th chunk of a document"""
+    return f"{hashlib.sha1(url.encode('utf-8')).hexdigest()[:12]}-{index}"
+
+
+class ChunkBuilder:
+    """Cuts text that arrives in pieces into overlapping chunks.
+
+    Chunks end on whitespace where possible and the overlap begins on a word
+    boundary. The cuts are identical to chunking the whole text at once;
+    only the text not yet emitted as a chunk is buffered.
+    """
+
+    def __init__(self, url: str, depth: Optional[int] = None,
+                 chunk_size: int = CHUNK_SIZE, overlap: int = CHUNK_OVERLAP,
+                 preview_chars: int = PREVIEW_CHARS):
+        self.url = url
+        self.depth = depth
+        self.chunk_size = chunk_size
+        self.overlap = overlap
+        self.preview_chars = preview_chars
+        self.chunks: List[Dict] = []
+        self.length = 0
+        self._preview: List[str] = []
+        self._preview_length = 0
+        self._buffer = ''
+        # Position in _buffer where the next chunk starts, and the document offset of _buffer[0]
+        self._position = 0
+        self._offset = 0
+
+    def feed(self, text: str):
+        if not text:
+            return
+        if self._preview_length < self.preview_chars:
+            self._preview.append(text[:self.preview_chars - self._preview_length])
+            self._preview_length += len(self._preview[-1])
+        self.length += len(text)
+        # Drop the text already chunked before appending
+        self._offset += self._position
+        self._buffer = self._buffer[self._position:] + text
+        self._position = 0
+        # Cut only while text is known to continue past the chunk
+        while len(self._buffer) - self._position > self.chunk_size:
+            self._cut(final=False)
+
+    def close(self) -> List[Dict]:
+        if self._buffer[self._position:].strip():
+            self._cut(final=True)
+        self._buffer = ''
+        self._offset += self._position
+        self._position = 0
+        return self.chunks
+
+    @property
+    def preview(self) -> str:
+        return ''.join(self._preview)
+
+    def _cut(self, final: bool):
+        """Emit one chunk starting at _position; the final cut takes the rest of the buffer"""
+        buffer = self._buffer
+        start = self._position
+        end = len(buffer) if final else start + self.chunk_size
+        if not final:
+            space = buffer.rfind(' ', start + self.chunk_size // 2, end)
+            if space != -1:
+                end = space
+        self._emit(buffer[start:end], self._offset + start)
+        if final:
+            self._position = len(buffer)
+            return
+
+        next_start = max(end - self.overlap, start + 1)
+        # Begin the overlap on a word boundary
+        space = buffer.find(' ', next_start, end)
+        self._position = space + 1 if space != -1 else next_start
+
+    def _emit(self, raw: str, offset: int):
+        text = raw.strip()
+        if not text:
+            return
+        start = offset + len(raw) - len(raw.lstrip())
+        self.chunks.append({
+            'id': chunk_id(self.url, len(self.chunks)),
+            'url': self.url,
+            'depth': self.depth,
+            'start': start,
+            'end': start + len(text),
+            'text': text
+        })
+
+
+def build_chunks(url: str, pieces: Iterable[str], depth: Optional[int] = None,
+                 chunk_size: int = CHUNK_SIZE, overlap: int = CHUNK_OVERLAP) -> ChunkBuilder:
+    """Feed text pieces through a ChunkBuilder and close it"""
+    builder = ChunkBuilder(url, depth=depth, chunk_size=chunk_size, overlap=overlap)
+    for piece in pieces:
+        builder.feed(piece)
+    builder.close()
+    return builder
+
+
+def document_text(item: Dict) -> str:
+    """Full text of a document, rebuilt from its chunks (or its content when
+    it has none). The chunks overlap; only the gaps between them are
+    whitespace, so rebuilding fills those gaps with spaces."""
+    chunks = item.get('chunks')
+    if not chunks:
+        return item.get('content', '')
+    parts = []
+    position = chunks[0]['start']
+    for chunk in chunks:
+        if chunk['start'] > position:
+            parts.append(' ' * (chunk['start'] - position))
+            position = chunk['start']
+        parts.append(chunk['text'][position - chunk['start']:])
+        position = max(position, chunk['end'])
+    return ''.join(parts)
+
+
+def document_hash(item: Dict) -> str:
+    """SHA-256 over a document's status, title, duplicate mark and full text"""
+    digest = hashlib.sha256(f"{item['status']}\0{item['title']}\0".encode('utf-8'))
+    if item.get('duplicate_of'):
+        digest.update(f"duplicate_of\0{item['duplicate_of']}\0".encode('utf-8'))
+    chunks = item.get('chunks')
+    if chunks:
+        for chunk in chunks:
+            digest.update(f"{chunk['start']}\0{chunk['text']}\0".encode('utf-8'))
+    else:
+        digest.update(item.get('content', '').encode('utf-8'))
+    return digest.hexdigest()
@@ -0,0 +1,74 @@
+import heapq
+import itertools
+from typing import Dict, List, Optional, Set, Tuple
+
+from host_scheduler import HostScheduler
+
+# URLs containing these words are fetched before their siblings at the same depth
+PRIORITY_KEYWORDS = ('about', 'service', 'product', 'contact')
+
+
+class CrawlFrontier:
+    """Priority frontier for depth crawls.
+
+    URLs are kept in one heap per host, ordered by depth and then by the
+    keyword boost, with insertion order breaking ties so that plain
+    breadth-first order is preserved. Every URL is enqueued at most once.
+    """
+
+    def __init__(self, scheduler: Optional[HostScheduler] = None):
+        self.scheduler = scheduler
+        self._heaps: Dict[str, List[Tuple[float, int, str, int]]] = {}
+        self._enqueued: Set[str] = set()
+        self._counter = itertools.count()
+        self._size = 0
+
+    @staticmethod
+    def is_priority_link(url: str) -> bool:
+        """Navigation-style pages (about, services, ...) get a boost"""
+        lowered = url.lower()
+        return any(word in lowered for word in PRIORITY_KEYWORDS)
+
+    @classmethod
+    def priority(cls, url: str, depth: int) -> float:
+        """Lower scores are crawled first"""
+        return depth - (0.5 if cls.is_priority_link(url) else 0.0)
+
+    def push(self, url: str, depth: int) -> bool:
+        """Queue a URL unless it has been queued before. Returns True if added."""
+        if url in self._enqueued:
+            return False
+        self._enqueued.add(url)
+        host = HostScheduler.host_of(url)
+        entry = (self.priority(url, depth), next(self._counter), url, depth)
+        heapq.heappush(self._heaps.setdefault(host, []), entry)
+        self._size += 1
+        return True
+
+    def pop(self) -> Tuple[str, int]:
+        """Remove and return the next (url, depth).
+
+        Picks the host that becomes ready earliest and, among ready hosts,
+        the best-scored URL."""
+        if not self._size:
+            raise IndexError('pop from an empty frontier')
+
+        if self.scheduler is not None:
+            now = self.scheduler.now()
+            host = min(self._heaps, key=lambda h: (self.scheduler.host_ready_at(h, now), self._heaps[h][0]))
+        else:
+            host = min(self._heaps, key=lambda h: self._heaps[h][0])
+
+        heap = self._heaps[host]
+        _, _, url, depth = heapq.heappop(heap)
+        if not heap:
+            del self._heaps[host]
+        self._size -= 1
+        return url, depth
+
+    def mark_seen(self, url: str):
+        """Treat a URL as already queued (e.g. fetched before a resumed crawl)"""
+        self._enqueued.add(url)
+
+    def __len__(self) -> int:
+        return self._size
@@ -0,0 +1,138 @@
+import threading
+import time
+from collections import deque
+from typing import Dict, Iterable, Iterator, Optional
+from urllib.parse import urlparse
+from urllib.robotparser import RobotFileParser
+
+import requests
+
+
+class HostScheduler:
+    """Per-host politeness scheduler.
+
+    Keeps a next-allowed-time for every hostname so that requests to
+    different hosts never wait on each other, while consecutive requests to
+    the same host are spaced by the configured delay or the robots.txt
+    ``Crawl-delay``, whichever is larger.
+    """
+
+    def __init__(self, delay: float = 1.0, session: Optional[requests.Session] = None,
+                 user_agent: str = '*', respect_robots: bool = True,
+                 max_crawl_delay: float = 30.0):
+        self.delay = delay
+        self.session = session or requests.Session()
+        self.user_agent = user_agent
+        self.respect_robots = respect_robots
+        self.max_crawl_delay = max_crawl_delay
+        self._next_allowed: Dict[str, float] = {}
+        self._host_delays: Dict[str, float] = {}
+        self._robots_locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def host_of(url: str) -> str:
+        """Hostname used as the politeness key for a URL"""
+        return (urlparse(url).hostname or '').lower()
+
+    def _fetch_crawl_delay(self, url: str) -> Optional[float]:
+        """Read Crawl-delay for our user agent from the host's robots.txt"""
+        parsed = urlparse(url)
+        robots_url = f"{parsed.scheme}://{parsed.netloc}/robots.txt"
+        try:
+            response = self.session.get(robots_url, timeout=5, verify=False)
+            if response.status_code != 200:
+                return None
+            parser = RobotFileParser()
+            parser.parse(response.text.splitlines())
+            crawl_delay = parser.crawl_delay(self.user_agent)
+            return float(crawl_delay) if crawl_delay is not None else None
+        except Exception:
+            return None
+
+    def knows_host(self, url: str) -> bool:
+        """True once the host's delay is resolved, i.e. host_delay() will not touch the network"""
+        return not self.respect_robots or self.host_of(url) in self._host_delays
+
+    def host_delay(self, url: str) -> float:
+        """Delay between requests to the URL's host (robots.txt is fetched once per host)"""
+        host = self.host_of(url)
+        if not self.respect_robots:
+            return self.delay
+        if host in self._host_delays:
+            return self._host_delays[host]
+
+        with self._lock:
+            host_lock = self._robots_locks.setdefault(host, threading.Lock())
+        with host_lock:
+            if host not in self._host_delays:
+                crawl_delay = self._fetch_crawl_delay(url)
+                if crawl_delay is not None:
+                    crawl_delay = min(crawl_delay, self.max_crawl_delay)
+                self._host_delays[host] = max(self.delay, crawl_delay or 0.0)
+        return self._host_delays[host]
+
+    @staticmethod
+    def now() -> float:
+        return time.monotonic()
+
+    def host_ready_at(self, host: str, now: Optional[float] = None) -> float:
+        """Monotonic time at which the host may next be contacted"""
+        now = time.monotonic() if now is None else now
+        return max(now, self._next_allowed.get(host, now))
+
+    def ready_at(self, url: str, now: Optional[float] = None) -> float:
+        """Monotonic time at which the URL's host may next be contacted"""
+        return self.host_ready_at(self.host_of(url), now)
+
+    def reserve(self, url: str) -> float:
+        """Claim the next request slot for the URL's host.
+        Returns how many seconds the caller must wait before sending it."""
+        delay = self.host_delay(url)
+        host = self.host_of(url)
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_allowed.get(host, now))
+            self._next_allowed[host] = slot + delay
+        return slot - now
+
+    def wait(self, url: str):
+        """Block until a request to the URL's host is allowed"""
+        remaining = self.reserve(url)
+        if remaining > 0:
+            time.sleep(remaining)
+
+    def export_hosts(self, hosts: Optional[Iterable[str]] = None) -> Dict[str, Dict[str, float]]:
+        """Per-host state for persisting: the delay and, as wall-clock time, the
+        next allowed request. Covers the given hosts, or every host seen."""
+        with self._lock:
+            offset = time.time() - time.monotonic()
+            hosts = list(self._next_allowed) if hosts is None else hosts
+            return {host: {'delay': self._host_delays.get(host, self.delay),
+                           'next_allowed': self._next_allowed[host] + offset}
+                    for host in hosts if host in self._next_allowed}
+
+    def restore_hosts(self, state: Dict[str, Dict[str, float]]):
+        """Load state produced by export_hosts (robots.txt is not fetched again)"""
+        with self._lock:
+            offset = time.time() - time.monotonic()
+            for host, entry in state.items():
+                if self.respect_robots:
+                    self._host_delays[host] = entry['delay']
+                self._next_allowed[host] = entry['next_allowed'] - offset
+
+    def iter_ready(self, urls: Iterable[str]) -> Iterator[str]:
+        """Yield URLs in the order their hosts become ready, waiting only when
+        every pending host is still inside its politeness window."""
+        queues: Dict[str, deque] = {}
+        for url in urls:
+            queues.setdefault(self.host_of(url), deque()).append(url)
+
+        while queues:
+            now = time.monotonic()
+            host = min(queues, key=lambda h: self.host_ready_at(h, now))
+            url = queues[host].popleft()
+            if not queues[host]:
+                del queues[host]
+            self.wait(url)
+            yield url
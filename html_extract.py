@@ -0,0 +1,238 @@
+"""Single-pass HTML extraction.
+
+Title, visible text and raw link targets are collected in one traversal of
+the document. The fastest installed parser is used: selectolax (lexbor),
+then lxml, then BeautifulSoup.
+"""
+
+import codecs
+import re
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from bs4 import BeautifulSoup, CData, NavigableString, Tag, UnicodeDammit
+
+from documents import ChunkBuilder
+
+try:
+    from selectolax.lexbor import LexborHTMLParser
+except ImportError:
+    LexborHTMLParser = None
+
+try:
+    from lxml import etree
+except ImportError:
+    etree = None
+
+# Elements whose text is never visible
+SKIP_TEXT_TAGS = frozenset(['script', 'style'])
+# Elements whose whole subtree is inert: no visible text and no followable links.
+# lexbor keeps template content out of the tree; lxml and BeautifulSoup do not.
+SKIP_SUBTREE_TAGS = frozenset(['template'])
+# Elements that carry followable link targets
+LINK_TAGS = frozenset(['a', 'area', 'link'])
+
+if LexborHTMLParser is not None:
+    DEFAULT_BACKEND = 'selectolax'
+elif etree is not None:
+    DEFAULT_BACKEND = 'lxml'
+else:
+    DEFAULT_BACKEND = 'bs4'
+
+_HEADER_CHARSET = re.compile(r'charset\s*=\s*["\']?([^"\';\s]+)', re.IGNORECASE)
+_META_CHARSET = re.compile(rb'<meta[^>]+charset=["\']?([A-Za-z0-9_.:-]+)', re.IGNORECASE)
+# Every character str.splitlines() breaks on
+_LINE_BREAK = re.compile('[\n\r\x0b\x0c\x1c\x1d\x1e\x85\u2028\u2029]')
+
+
+def _clean_lines(text: str) -> str:
+    lines = (line.strip() for line in text.splitlines())
+    chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
+    return ' '.join(chunk for chunk in chunks if chunk)
+
+
+def iter_clean_text(pieces: Iterable[str]) -> Iterator[str]:
+    """Collapse whitespace the same way the scraper always has: strip lines,
+    split on double spaces and join the remaining phrases with one space.
+    Cleaned text is yielded each time an input line is complete, so the
+    whole text is never assembled."""
+    pending: List[str] = []
+    first = True
+    for piece in pieces:
+        last_break = None
+        for last_break in _LINE_BREAK.finditer(piece):
+            pass
+        if last_break is None:
+            pending.append(piece)
+            continue
+        pending.append(piece[:last_break.end()])
+        cleaned = _clean_lines(''.join(pending))
+        if cleaned:
+            yield cleaned if first else ' ' + cleaned
+            first = False
+        pending = [piece[last_break.end():]]
+    cleaned = _clean_lines(''.join(pending))
+    if cleaned:
+        yield cleaned if first else ' ' + cleaned
+
+
+def _lookup_encoding(name: Optional[str]) -> Optional[str]:
+    if not name:
+        return None
+    try:
+        return codecs.lookup(name).name
+    except LookupError:
+        return None
+
+
+def charset_from_content_type(content_type: Optional[str]) -> Optional[str]:
+    """Charset parameter of a Content-Type header, if any"""
+    match = _HEADER_CHARSET.search(content_type or '')
+    return match.group(1) if match else None
+
+
+def sniff_encoding(body: bytes, declared: Optional[str] = None) -> str:
+    """Encoding of an HTML document, in the browser's order of precedence: a
+    BOM, the charset declared by the HTTP Content-Type (``declared``), then
+    <meta charset>. Undeclared documents go to BeautifulSoup's UnicodeDammit:
+    UTF-8 if the body decodes as UTF-8, else windows-1252."""
+    if body.startswith(codecs.BOM_UTF8):
+        return 'utf-8'
+    encoding = _lookup_encoding(declared)
+    if encoding:
+        return encoding
+    match = _META_CHARSET.search(body[:2048])
+    if match:
+        encoding = _lookup_encoding(match.group(1).decode('ascii'))
+        if encoding:
+            return encoding
+    # UTF-8 and windows-1252 (the web's legacy default) are tried before any
+    # statistical guess, which is unreliable on short pages
+    dammit = UnicodeDammit(body, user_encodings=['utf-8', 'windows-1252'], is_html=True)
+    return _lookup_encoding(dammit.original_encoding) or 'utf-8'
+
+
+# The backends are generators of raw text pieces in document order; the title
+# and link targets they find are stored in the `found` dict as they go.
+# `encoding` is the charset declared by the HTTP response, if any.
+
+def _walk_selectolax(body: bytes, want_links: bool, found: Dict,
+                     encoding: Optional[str] = None) -> Iterator[str]:
+    tree = LexborHTMLParser(body.decode(sniff_encoding(body, encoding), errors='replace'))
+    hrefs = found['hrefs']
+    if tree.root is None:
+        return
+
+    for node in tree.root.traverse(include_text=True):
+        tag = node.tag
+        if tag == '-text':
+            parent = node.parent
+            parent_tag = parent.tag if parent is not None else None
+            if parent_tag in SKIP_TEXT_TAGS:
+                continue
+            text = node.text_content or ''
+            if parent_tag == 'title' and found['title'] is None:
+                found['title'] = text
+            yield text
+        elif want_links and tag in LINK_TAGS:
+            href = node.attributes.get('href')
+            if href:
+                hrefs.append(href)
+
+
+def _walk_lxml(body: bytes, want_links: bool, found: Dict,
+               encoding: Optional[str] = None) -> Iterator[str]:
+    hrefs = found['hrefs']
+    parser = etree.HTMLParser(encoding=sniff_encoding(body, encoding))
+    root = etree.fromstring(body, parser) if body.strip() else None
+    if root is None:
+        return
+
+    # Comments and processing instructions are walked only for the text after them
+    walker = etree.iterwalk(root, events=('start', 'end', 'comment', 'pi'))
+    for event, element in walker:
+        tag = element.tag if isinstance(element.tag, str) else None
+        if event == 'start':
+            if tag in SKIP_SUBTREE_TAGS:
+                # Its tail is still yielded by the 'end' event
+                walker.skip_subtree()
+                continue
+            if tag is None or tag in SKIP_TEXT_TAGS:
+                continue
+            if element.text:
+                if tag == 'title' and found['title'] is None:
+                    found['title'] = element.text
+                yield element.text
+            if want_links and tag in LINK_TAGS:
+                href = element.get('href')
+                if href:
+                    hrefs.append(href)
+        elif element.tail:
+            yield element.tail
+
+
+def _walk_bs4(body: bytes, want_links: bool, found: Dict,
+              encoding: Optional[str] = None) -> Iterator[str]:
+    soup = BeautifulSoup(body, 'lxml' if etree is not None else 'html.parser',
+                         from_encoding=sniff_encoding(body, encoding))
+    for template in soup.find_all(SKIP_SUBTREE_TAGS):
+        template.decompose()
+    hrefs = found['hrefs']
+
+    for element in soup.descendants:
+        if isinstance(element, Tag):
+            if want_links and element.name in LINK_TAGS:
+                href = element.get('href')
+                if href:
+                    hrefs.append(href)
+        elif type(element) in (NavigableString, CData):
+            parent_name = element.parent.name if element.parent is not None else None
+            if parent_name in SKIP_TEXT_TAGS:
+                continue
+            if parent_name == 'title' and found['title'] is None:
+                found['title'] = str(element)
+            yield str(element)
+
+
+_BACKENDS = {
+    'selectolax': _walk_selectolax,
+    'lxml': _walk_lxml,
+    'bs4': _walk_bs4,
+}
+
+
+def available_backends() -> List[str]:
+    """Backends that can be used in this environment"""
+    backends = []
+    if LexborHTMLParser is not None:
+        backends.append('selectolax')
+    if etree is not None:
+        backends.append('lxml')
+    backends.append('bs4')
+    return backends
+
+
+def _walker(backend: Optional[str]):
+    backend = backend or DEFAULT_BACKEND
+    if backend not in available_backends():
+        raise ValueError(f"HTML parser backend '{backend}' is not available")
+    return _BACKENDS[backend]
+
+
+def _title_text(title: Optional[str]) -> str:
+    return title.strip() if title and title.strip() else "No title"
+
+
+def extract_document(body: bytes, url: str, depth: Optional[int] = None, want_links: bool = False,
+                     backend: Optional[str] = None,
+                     encoding: Optional[str] = None) -> Tuple[str, ChunkBuilder, List[str]]:
+    """Extract the title, visible text and raw hrefs of an HTML document in one
+    pass. The text is cut into chunks (see documents.py) while the document
+    is traversed, so the full text is never assembled. encoding is the
+    charset from the HTTP Content-Type, when there is one.
+    Returns (title, closed ChunkBuilder, raw hrefs)."""
+    found = {'title': None, 'hrefs': []}
+    builder = ChunkBuilder(url, depth=depth)
+    for piece in iter_clean_text(_walker(backend)(body, want_links, found, encoding)):
+        builder.feed(piece)
+    builder.close()
+    return _title_text(found['title']), builder, found['hrefs']
@@ -0,0 +1,129 @@
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional
+
+
+class ResponseCache:
+    """On-disk HTTP response cache backed by SQLite.
+
+    Bodies are stored with their ETag / Last-Modified validators, keyed by
+    normalized URL, so a later fetch can be revalidated with a conditional
+    request. Entries expire after ``ttl`` seconds and the least recently used
+    entries are evicted once the stored bodies exceed ``max_bytes``.
+    """
+
+    def __init__(self, path: str = os.path.join('.cache', 'http_cache.sqlite'),
+                 ttl: float = 7 * 24 * 3600, max_bytes: int = 200 * 1024 * 1024):
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                url TEXT PRIMARY KEY,
+                body BLOB NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                content_type TEXT,
+                size INTEGER NOT NULL,
+                stored_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_accessed ON responses (accessed_at)")
+        self._conn.commit()
+        self._total_bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        self.evict()
+
+    def get(self, url: str) -> Optional[Dict]:
+        """Return the cached entry for a URL, or None if missing or expired"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT body, etag, last_modified, content_type, stored_at FROM responses WHERE url = ?",
+                (url,)
+            ).fetchone()
+            if row is None or time.time() - row[4] > self.ttl:
+                return None
+            self._conn.execute("UPDATE responses SET accessed_at = ? WHERE url = ?", (time.time(), url))
+            self._conn.commit()
+        return {
+            'body': row[0],
+            'etag': row[1],
+            'last_modified': row[2],
+            'content_type': row[3],
+            'stored_at': row[4]
+        }
+
+    @staticmethod
+    def conditional_headers(entry: Optional[Dict]) -> Dict[str, str]:
+        """Request headers that revalidate a cached entry"""
+        headers = {}
+        if entry:
+            if entry.get('etag'):
+                headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'):
+                headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def put(self, url: str, body: bytes, etag: Optional[str] = None,
+            last_modified: Optional[str] = None, content_type: Optional[str] = None):
+        """Store a response. Responses without validators cannot be revalidated and are skipped."""
+        if not (etag or last_modified) or len(body) > self.max_bytes:
+            return
+        now = time.time()
+        with self._lock:
+            previous = self._conn.execute("SELECT size FROM responses WHERE url = ?", (url,)).fetchone()
+            self._total_bytes += len(body) - (previous[0] if previous else 0)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (url, sqlite3.Binary(body), etag, last_modified, content_type, len(body), now, now)
+            )
+            self._conn.commit()
+        self._evict_to_size()
+
+    def touch(self, url: str):
+        """Mark an entry as revalidated (a 304 response) and recently used"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute("UPDATE responses SET stored_at = ?, accessed_at = ? WHERE url = ?",
+                               (now, now, url))
+            self._conn.commit()
+
+    def evict(self):
+        """Drop expired entries, then trim to the size limit"""
+        with self._lock:
+            self._conn.execute("DELETE FROM responses WHERE stored_at < ?", (time.time() - self.ttl,))
+            self._conn.commit()
+            self._total_bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        self._evict_to_size()
+
+    def _evict_to_size(self):
+        with self._lock:
+            if self._total_bytes <= self.max_bytes:
+                return
+            rows = self._conn.execute("SELECT url, size FROM responses ORDER BY accessed_at")
+            stale = []
+            for url, size in rows:
+                if self._total_bytes <= self.max_bytes:
+                    break
+                stale.append((url,))
+                self._total_bytes -= size
+            self._conn.executemany("DELETE FROM responses WHERE url = ?", stale)
+            self._conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+            self._total_bytes = 0
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,265 @@
+"""Timing spans and counters for the scraper and chatbot hot paths.
+
+Instrumentation is off by default. While it is off, ``span()`` returns a
+shared no-op object and ``incr()`` returns at once, so the hooks cost a
+function call each. Turn it on with ``enable()`` and give it one or more
+sinks::
+
+    import instrumentation
+    prometheus = instrumentation.PrometheusSink()
+    instrumentation.enable(prometheus, instrumentation.LogSink())
+    ...
+    print(prometheus.render())
+
+Span names used by the project:
+- fetch: one HTTP fetch
+  - fetch.wait: until the response headers arrive (DNS, connect, TLS and server time)
+  - fetch.body: the download of the body
+- parse: HTML parsing, text cleanup and chunking
+- fingerprint: SimHash of a page's text for near-duplicate detection
+- normalize: resolving and normalizing a page's links
+- links: filtering a page's links
+- retrieve: BM25 retrieval
+- context: prompt context assembly
+- tokenize: token counting
+- llm: a chat completion request
+  - llm.first_token: until the first token of a streamed answer
+Counters include fetch.bytes, fetch.not_modified, pages.errors, pages.duplicates,
+answer_cache.hits and llm.errors.
+"""
+
+import logging
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+_enabled = False
+_sinks: Tuple['Sink', ...] = ()
+_lock = threading.Lock()
+
+LabelKey = Tuple[str, Tuple[Tuple[str, str], ...]]
+
+
+class Sink:
+    """Receives finished spans and counter increments"""
+
+    def record_span(self, name: str, seconds: float, labels: Dict[str, str]):
+        pass
+
+    def record_count(self, name: str, value: float, labels: Dict[str, str]):
+        pass
+
+
+class AggregatingSink(Sink):
+    """Keeps count, total and maximum per span and a total per counter"""
+
+    def __init__(self):
+        self._spans: Dict[LabelKey, List[float]] = {}
+        self._counts: Dict[LabelKey, float] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(name: str, labels: Dict[str, str]) -> LabelKey:
+        return name, tuple(sorted(labels.items())) if labels else ()
+
+    def record_span(self, name: str, seconds: float, labels: Dict[str, str]):
+        key = self._key(name, labels)
+        with self._lock:
+            stats = self._spans.get(key)
+            if stats is None:
+                self._spans[key] = [1, seconds, seconds]
+            else:
+                stats[0] += 1
+                stats[1] += seconds
+                stats[2] = max(stats[2], seconds)
+
+    def record_count(self, name: str, value: float, labels: Dict[str, str]):
+        key = self._key(name, labels)
+        with self._lock:
+            self._counts[key] = self._counts.get(key, 0) + value
+
+    @staticmethod
+    def _label_name(key: LabelKey) -> str:
+        name, labels = key
+        if not labels:
+            return name
+        return name + '{' + ','.join(f'{k}={v}' for k, v in labels) + '}'
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """{span: {'count', 'total_s', 'mean_ms', 'max_ms'}} plus {counter: {'total'}}"""
+        with self._lock:
+            result = {}
+            for key, (count, total, peak) in self._spans.items():
+                result[self._label_name(key)] = {
+                    'count': count,
+                    'total_s': round(total, 6),
+                    'mean_ms': round(1000 * total / count, 3),
+                    'max_ms': round(1000 * peak, 3)
+                }
+            for key, total in self._counts.items():
+                result[self._label_name(key)] = {'total': total}
+            return result
+
+    def total(self, name: str) -> float:
+        """Summed seconds of a span (over all label values)"""
+        with self._lock:
+            return sum(stats[1] for (span_name, _), stats in self._spans.items() if span_name == name)
+
+    def reset(self):
+        with self._lock:
+            self._spans.clear()
+            self._counts.clear()
+
+
+class MemorySink(AggregatingSink):
+    """In-memory collector, e.g. for tests: aggregates and, with keep_events,
+    also keeps every event as ('span' | 'count', name, value, labels)"""
+
+    def __init__(self, keep_events: bool = False):
+        super().__init__()
+        self.keep_events = keep_events
+        self.events: List[Tuple[str, str, float, Dict[str, str]]] = []
+
+    def record_span(self, name: str, seconds: float, labels: Dict[str, str]):
+        super().record_span(name, seconds, labels)
+        if self.keep_events:
+            with self._lock:
+                self.events.append(('span', name, seconds, labels))
+
+    def record_count(self, name: str, value: float, labels: Dict[str, str]):
+        super().record_count(name, value, labels)
+        if self.keep_events:
+            with self._lock:
+                self.events.append(('count', name, value, labels))
+
+    def reset(self):
+        super().reset()
+        with self._lock:
+            self.events.clear()
+
+
+def _escape_label(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class PrometheusSink(AggregatingSink):
+    """Aggregates spans and counters and renders them in the Prometheus text format"""
+
+    def __init__(self, prefix: str = 'webchat'):
+        super().__init__()
+        self.prefix = prefix
+
+    @staticmethod
+    def _labels(name_label: str, name: str, labels: Tuple[Tuple[str, str], ...]) -> str:
+        pairs = [(name_label, name)] + list(labels)
+        return '{' + ','.join(f'{key}="{_escape_label(value)}"' for key, value in pairs) + '}'
+
+    def render(self) -> str:
+        with self._lock:
+            spans = dict(self._spans)
+            counts = dict(self._counts)
+        lines = [f'# TYPE {self.prefix}_span_seconds summary']
+        for (name, labels), (count, total, _) in sorted(spans.items()):
+            label_text = self._labels('span', name, labels)
+            lines.append(f'{self.prefix}_span_seconds_count{label_text} {count}')
+            lines.append(f'{self.prefix}_span_seconds_sum{label_text} {total:.6f}')
+        lines.append(f'# TYPE {self.prefix}_events_total counter')
+        for (name, labels), total in sorted(counts.items()):
+            lines.append(f'{self.prefix}_events_total{self._labels("event", name, labels)} {total:g}')
+        return '\n'.join(lines) + '\n'
+
+
+class LogSink(Sink):
+    """Writes one log line per span and counter increment"""
+
+    def __init__(self, logger: Optional[logging.Logger] = None, level: int = logging.INFO):
+        self.logger = logger or logging.getLogger('webchat.instrumentation')
+        self.level = level
+
+    def record_span(self, name: str, seconds: float, labels: Dict[str, str]):
+        self.logger.log(self.level, "span %s %.2fms %s", name, 1000 * seconds, labels or '')
+
+    def record_count(self, name: str, value: float, labels: Dict[str, str]):
+        self.logger.log(self.level, "count %s +%g %s", name, value, labels or '')
+
+
+class _Span:
+    __slots__ = ('name', 'labels', 'collector', 'start')
+
+    def __init__(self, name: str, labels: Dict[str, str], collector: Optional[Sink]):
+        self.name = name
+        self.labels = labels
+        self.collector = collector
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        elapsed = time.perf_counter() - self.start
+        for sink in _sinks:
+            sink.record_span(self.name, elapsed, self.labels)
+        if self.collector is not None:
+            self.collector.record_span(self.name, elapsed, self.labels)
+        return False
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def enable(*sinks: Sink):
+    """Turn instrumentation on, adding the given sinks. Enabling with no sinks
+    still feeds per-object collectors (e.g. the scraper's timings)."""
+    global _enabled, _sinks
+    with _lock:
+        _sinks = _sinks + tuple(sink for sink in sinks if sink not in _sinks)
+        _enabled = True
+
+
+def disable():
+    """Turn instrumentation off and drop all sinks"""
+    global _enabled, _sinks
+    with _lock:
+        _enabled = False
+        _sinks = ()
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def span(name: str, collector: Optional[Sink] = None, **labels):
+    """Context manager timing a block. collector, if given, also receives it."""
+    if not _enabled:
+        return _NULL_SPAN
+    return _Span(name, labels, collector)
+
+
+def record(name: str, seconds: float, collector: Optional[Sink] = None, **labels):
+    """Record a span measured by the caller, for intervals that don't fit a with block"""
+    if not _enabled:
+        return
+    for sink in _sinks:
+        sink.record_span(name, seconds, labels)
+    if collector is not None:
+        collector.record_span(name, seconds, labels)
+
+
+def incr(name: str, value: float = 1, collector: Optional[Sink] = None, **labels):
+    """Add to a counter"""
+    if not _enabled:
+        return
+    for sink in _sinks:
+        sink.record_count(name, value, labels)
+    if collector is not None:
+        collector.record_count(name, value, labels)
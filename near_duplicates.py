@@ -0,0 +1,104 @@
+import hashlib
+import re
+import threading
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+FINGERPRINT_BITS = 64
+# Words per shingle
+SHINGLE_SIZE = 3
+# Pages with fewer words than this get no fingerprint; short texts collide too easily
+MIN_WORDS = 20
+# Only this many leading words are shingled, which bounds the cost on very long pages
+MAX_WORDS = 20000
+# Fingerprints within this many differing bits are near-duplicates (Manku et al. use 3 for 64 bits)
+MAX_DISTANCE = 3
+
+_WORD = re.compile(r'\w+')
+# translate() tables mapping a byte to 1 if the given bit is set, else 0
+_BIT_TABLES = [bytes(value >> bit & 1 for value in range(256)) for bit in range(8)]
+
+
+def simhash(text: str, shingle_size: int = SHINGLE_SIZE, min_words: int = MIN_WORDS,
+            max_words: int = MAX_WORDS) -> Optional[int]:
+    """64-bit SimHash of a text's word shingles, or None for texts shorter than
+    min_words. Similar texts get fingerprints that differ in few bits."""
+    words = _WORD.findall(text.lower())[:max_words]
+    if len(words) < min_words:
+        return None
+    # Shingles as word tuples, counted in C; only distinct ones are joined and hashed
+    shingles = Counter(zip(*(words[offset:] for offset in range(shingle_size))))
+
+    # Digests of all shingles back to back, each repeated by its weight. Each
+    # bit total is then counted in C: take one byte position of every digest,
+    # map bytes to 1/0 by that bit with translate() and count the ones.
+    digest_size = FINGERPRINT_BITS // 8
+    blake2b = hashlib.blake2b
+    digests = b''.join(blake2b(' '.join(shingle).encode('utf-8'), digest_size=digest_size).digest() * weight
+                       for shingle, weight in shingles.items())
+    totals = []
+    for index in range(digest_size):
+        column = digests[index::digest_size]
+        totals.extend(column.translate(table).count(1) for table in _BIT_TABLES)
+
+    # A bit is set where more than half of the (weighted) shingles have it set
+    half = len(digests) / digest_size / 2
+    fingerprint = 0
+    for position, total in enumerate(totals):
+        if total > half:
+            fingerprint |= 1 << position
+    return fingerprint
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return bin(a ^ b).count('1')
+
+
+class SimHashIndex:
+    """Fingerprints of the pages seen so far, searchable for near-duplicates.
+
+    The 64 bits are split into max_distance + 1 bands; two fingerprints within
+    max_distance bits must agree exactly on at least one band, so only pages
+    sharing a band are compared.
+    """
+
+    def __init__(self, max_distance: int = MAX_DISTANCE):
+        self.max_distance = max_distance
+        self._band_count = max_distance + 1
+        self._bands: List[Tuple[int, int]] = []
+        start = 0
+        for band in range(self._band_count):
+            width = FINGERPRINT_BITS // self._band_count + (band < FINGERPRINT_BITS % self._band_count)
+            self._bands.append((start, (1 << width) - 1))
+            start += width
+        self._tables: List[Dict[int, List[Tuple[int, str]]]] = [{} for _ in self._bands]
+        self._lock = threading.Lock()
+
+    def _band_values(self, fingerprint: int) -> List[int]:
+        return [(fingerprint >> start) & mask for start, mask in self._bands]
+
+    def find(self, fingerprint: int) -> Optional[str]:
+        """URL of the first indexed page within max_distance bits, if any"""
+        with self._lock:
+            for table, value in zip(self._tables, self._band_values(fingerprint)):
+                for candidate, url in table.get(value, ()):
+                    if hamming_distance(candidate, fingerprint) <= self.max_distance:
+                        return url
+        return None
+
+    def add(self, fingerprint: int, url: str):
+        with self._lock:
+            for table, value in zip(self._tables, self._band_values(fingerprint)):
+                table.setdefault(value, []).append((fingerprint, url))
+
+    def add_or_find(self, fingerprint: int, url: str) -> Optional[str]:
+        """URL this fingerprint duplicates, or None after indexing it as a new page"""
+        original = self.find(fingerprint)
+        if original is None:
+            self.add(fingerprint, url)
+        return original
+
+    def clear(self):
+        with self._lock:
+            for table in self._tables:
+                table.clear()
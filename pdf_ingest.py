@@ -0,0 +1,230 @@
+import hashlib
+import io
+import multiprocessing
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from PyPDF2 import PdfReader
+
+from documents import build_chunks
+
+# Characters of text extracted per PDF; the full text is kept as chunks
+MAX_PDF_CHARS = 2_000_000
+# Pages parsed by one worker task; bigger files are split into several tasks
+PAGES_PER_TASK = 20
+
+# forkserver avoids forking the (multi-threaded) Streamlit server process
+_START_METHOD = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool(max_workers: Optional[int] = None) -> ProcessPoolExecutor:
+    """Process pool shared by every ingestion in this process (workers start once)"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=max_workers or os.cpu_count(),
+                                        mp_context=multiprocessing.get_context(_START_METHOD))
+        return _pool
+
+
+def _discard_pool():
+    """Drop a broken pool so the next ingestion starts a fresh one"""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+def _extract_pages(data: bytes, start: int, stop: int,
+                   max_chars: Optional[int]) -> Tuple[int, str]:
+    """Worker: text of pages [start, stop) and the document's page count.
+    Stops early once max_chars characters have been extracted."""
+    reader = PdfReader(io.BytesIO(data))
+    pages = reader.pages
+    texts = []
+    total = 0
+    for number in range(start, min(stop, len(pages))):
+        try:
+            text = pages[number].extract_text() or ""
+        except Exception:
+            continue
+        texts.append(text)
+        total += len(text) + 1
+        if max_chars is not None and total >= max_chars:
+            break
+    return len(pages), "\n".join(texts)
+
+
+def pdf_result(name: str, text: str, max_chars: Optional[int] = MAX_PDF_CHARS) -> Dict:
+    """Result dict for a parsed PDF, shaped like a scraper result (see documents.py)"""
+    url = f"uploaded://{name}"
+    document = build_chunks(url, [text[:max_chars] if max_chars is not None else text])
+    return {
+        'url': url,
+        'title': os.path.splitext(os.path.basename(name))[0],
+        'content': document.preview,
+        'status': 'success',
+        'length': document.length,
+        'chunks': document.chunks
+    }
+
+
+def pdf_error_result(name: str, error: Exception) -> Dict[str, str]:
+    return {
+        'url': f"uploaded://{name}",
+        'title': 'PDF Parse Error',
+        'content': '',
+        'status': f'error: {str(error)}',
+        'chunks': []
+    }
+
+
+class PdfParseCache:
+    """Extracted PDF text keyed by the SHA-256 of the file's bytes.
+
+    An LRU bounded both by entry count and by total characters held; the same
+    document uploaded again (under any name, by any session) is not re-parsed.
+    """
+
+    def __init__(self, max_entries: int = 256, max_chars: int = 20_000_000):
+        self.max_entries = max_entries
+        self.max_chars = max_chars
+        self._entries: 'OrderedDict[Tuple[str, Optional[int]], str]' = OrderedDict()
+        self._chars = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def digest(data: bytes) -> str:
+        return hashlib.sha256(data).hexdigest()
+
+    def get(self, digest: str, max_chars: Optional[int]) -> Optional[str]:
+        with self._lock:
+            text = self._entries.get((digest, max_chars))
+            if text is not None:
+                self._entries.move_to_end((digest, max_chars))
+            return text
+
+    def put(self, digest: str, max_chars: Optional[int], text: str):
+        key = (digest, max_chars)
+        with self._lock:
+            if key in self._entries:
+                self._chars -= len(self._entries.pop(key))
+            self._entries[key] = text
+            self._chars += len(text)
+            while self._entries and (len(self._entries) > self.max_entries or
+                                     self._chars > self.max_chars):
+                _, evicted = self._entries.popitem(last=False)
+                self._chars -= len(evicted)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._chars = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class _PendingPdf:
+    """Page-range texts collected so far for one file"""
+
+    def __init__(self, name: str, data: bytes, digest: Optional[str] = None):
+        self.name = name
+        self.data = data
+        self.digest = digest
+        self.texts: Dict[int, str] = {}
+        self.expected = 1
+
+    def prefix(self, pages_per_task: int) -> Tuple[str, bool]:
+        """Text of the leading ranges that have arrived, and whether every range is in"""
+        texts = []
+        start = 0
+        while start in self.texts:
+            texts.append(self.texts[start])
+            start += pages_per_task
+        return "\n".join(texts), len(texts) == self.expected
+
+
+def iter_parse_pdfs(files: List[Tuple[str, bytes]], max_chars: Optional[int] = MAX_PDF_CHARS,
+                    max_workers: Optional[int] = None, pages_per_task: int = PAGES_PER_TASK,
+                    cache: Optional[PdfParseCache] = None) -> Iterator[Dict[str, str]]:
+    """Parse (name, bytes) PDFs on a process pool, yielding one result dict per
+    file as soon as that file is done (completion order, not input order).
+
+    The first task of each file parses its first pages_per_task pages and
+    reports the page count; longer files then get one task per further page
+    range. A file finishes as soon as its leading ranges hold max_chars
+    characters, and its outstanding tasks are cancelled.
+
+    With a cache, files whose bytes were parsed before are yielded first,
+    without touching the pool.
+    """
+    to_parse = []
+    for name, data in files:
+        digest = PdfParseCache.digest(data) if cache is not None else None
+        text = cache.get(digest, max_chars) if cache is not None else None
+        if text is not None:
+            yield pdf_result(name, text, max_chars)
+        else:
+            to_parse.append(_PendingPdf(name, data, digest))
+    if not to_parse:
+        return
+
+    pool = _get_pool(max_workers)
+    pending = {}
+    for state in to_parse:
+        pending[pool.submit(_extract_pages, state.data, 0, pages_per_task, max_chars)] = (state, 0)
+
+    broken = False
+    finished = set()
+    try:
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                state, start = pending.pop(future)
+                if id(state) in finished or future.cancelled():
+                    continue
+                try:
+                    page_count, text = future.result()
+                except Exception as e:
+                    broken = broken or isinstance(e, BrokenProcessPool)
+                    if start == 0:
+                        finished.add(id(state))
+                        yield pdf_error_result(state.name, e)
+                        continue
+                    # A later range that fails contributes no text, like an unreadable page
+                    page_count, text = None, ""
+
+                state.texts[start] = text
+                if start == 0 and page_count > pages_per_task and (
+                        max_chars is None or len(text) < max_chars):
+                    for range_start in range(pages_per_task, page_count, pages_per_task):
+                        future = pool.submit(_extract_pages, state.data, range_start,
+                                             range_start + pages_per_task, max_chars)
+                        pending[future] = (state, range_start)
+                        state.expected += 1
+
+                full_text, complete = state.prefix(pages_per_task)
+                if complete or (max_chars is not None and len(full_text) >= max_chars):
+                    finished.add(id(state))
+                    for other, (other_state, _) in pending.items():
+                        if other_state is state:
+                            other.cancel()
+                    if max_chars is not None:
+                        full_text = full_text[:max_chars]
+                    if cache is not None:
+                        cache.put(state.digest, max_chars, full_text)
+                    yield pdf_result(state.name, full_text, max_chars)
+    finally:
+        for future in pending:
+            future.cancel()
+        if broken:
+            _discard_pool()
@@ -0,0 +1,110 @@
+import math
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+from instrumentation import span
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+# Tokens the chat format adds around every message (role, separators)
+MESSAGE_OVERHEAD = 4
+# Tokens that prime the assistant's reply
+REPLY_PRIMING = 3
+
+
+@lru_cache(maxsize=None)
+def _load_encoding(model: str):
+    """tiktoken encoding for the model, or None when tiktoken or its BPE files are unavailable"""
+    if tiktoken is None:
+        return None
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        try:
+            return tiktoken.get_encoding('cl100k_base')
+        except Exception:
+            return None
+    except Exception:
+        # e.g. the BPE file cannot be downloaded on an offline machine
+        return None
+
+
+class TokenCounter:
+    """Counts tokens with tiktoken when available, otherwise estimates
+    about four characters per token (slightly pessimistic for English)."""
+
+    def __init__(self, model: str = 'gpt-3.5-turbo'):
+        self.model = model
+        self._encoding = _load_encoding(model)
+
+    @property
+    def exact(self) -> bool:
+        return self._encoding is not None
+
+    def count(self, text: str) -> int:
+        if not text:
+            return 0
+        if self._encoding is not None:
+            with span('tokenize'):
+                return len(self._encoding.encode(text, disallowed_special=()))
+        return math.ceil(len(text) / 4)
+
+    def count_message(self, message: Dict[str, str]) -> int:
+        return self.count(message.get('content') or '') + MESSAGE_OVERHEAD
+
+    def count_messages(self, messages: List[Dict[str, str]]) -> int:
+        return sum(self.count_message(message) for message in messages) + REPLY_PRIMING
+
+
+class PromptBudget:
+    """Token budget for one chat completion.
+
+    The model's context window is split between the system prompt, the
+    conversation history, the retrieved content and the answer. History and
+    content have their own caps so that per-call cost stays predictable, and
+    content is further limited to whatever the window has left.
+    """
+
+    def __init__(self, context_window: int = 16385, answer_tokens: int = 500,
+                 history_tokens: int = 1500, content_tokens: int = 4000,
+                 safety_margin: int = 100):
+        self.context_window = context_window
+        self.answer_tokens = answer_tokens
+        self.history_tokens = history_tokens
+        self.content_tokens = content_tokens
+        self.safety_margin = safety_margin
+
+    def content_allowance(self, used_tokens: int) -> int:
+        """Tokens left for retrieved content once the other parts are placed"""
+        available = self.context_window - self.answer_tokens - self.safety_margin - used_tokens
+        return max(0, min(self.content_tokens, available))
+
+    def fit_history(self, history: List[Dict[str, str]], counter: TokenCounter,
+                    max_messages: Optional[int] = None) -> Tuple[List[Dict[str, str]], int]:
+        """Most recent history that fits the history budget, dropping the oldest
+        user/assistant pairs first. Returns (messages, tokens)."""
+        if max_messages is not None:
+            history = history[-max_messages:] if max_messages else []
+        history = list(history)
+        tokens = sum(counter.count_message(message) for message in history)
+        while history and tokens > self.history_tokens:
+            drop = 2 if len(history) >= 2 else 1
+            tokens -= sum(counter.count_message(message) for message in history[:drop])
+            history = history[drop:]
+        return history, tokens
+
+
+def pack(texts: List[str], counter: TokenCounter, max_tokens: int) -> Tuple[List[int], int]:
+    """Greedily choose texts (in ranked order) whose total token count fits
+    max_tokens; a text that does not fit is skipped so smaller ones after it
+    can still be used. Returns (indexes of chosen texts, tokens used)."""
+    chosen, used = [], 0
+    for index, text in enumerate(texts):
+        tokens = counter.count(text)
+        if used + tokens <= max_tokens:
+            chosen.append(index)
+            used += tokens
+    return chosen, used
@@ -0,0 +1,59 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from http.cookiejar import DefaultCookiePolicy
+from typing import Optional, Tuple
+
+import openai
+import requests
+from requests.adapters import HTTPAdapter
+
+# Connections kept alive per host by the shared scraping session. Every
+# WebScraper worker in the process draws from this pool, so size it for the
+# total number of concurrent fetches rather than for one scraper.
+HTTP_POOL_SIZE = 32
+# OpenAI clients kept for reuse. Every key typed into the sidebar (typos
+# included) gets a client, so only the most recently used ones are kept.
+MAX_OPENAI_CLIENTS = 8
+
+_lock = threading.Lock()
+_http_session: Optional[requests.Session] = None
+# (SHA-256 of the key, base_url) -> client, least recently used first
+_openai_clients: 'OrderedDict[Tuple[str, Optional[str]], openai.OpenAI]' = OrderedDict()
+
+
+def get_http_session() -> requests.Session:
+    """The process-wide requests.Session used for scraping.
+
+    Connections are kept alive between button clicks, reruns and users, so
+    repeat fetches from a host skip the TCP and TLS handshakes. Cookies are
+    never stored: the session is shared by unrelated users.
+    """
+    global _http_session
+    with _lock:
+        if _http_session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+            _http_session = session
+        return _http_session
+
+
+def get_openai_client(api_key: str, base_url: Optional[str] = None) -> 'openai.OpenAI':
+    """One OpenAI client (and so one keep-alive connection pool) per API key
+    and endpoint, shared by the whole process; the client is thread-safe.
+    Only the MAX_OPENAI_CLIENTS most recently used clients are kept. An
+    evicted client is not closed, since chatbots may still hold it."""
+    key = (hashlib.sha256(api_key.encode('utf-8')).hexdigest(), base_url)
+    with _lock:
+        client = _openai_clients.get(key)
+        if client is None:
+            client = openai.OpenAI(api_key=api_key, base_url=base_url)
+            _openai_clients[key] = client
+            while len(_openai_clients) > MAX_OPENAI_CLIENTS:
+                _openai_clients.popitem(last=False)
+        else:
+            _openai_clients.move_to_end(key)
+        return client
@@ -0,0 +1,288 @@
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import weakref
+from abc import ABC, abstractmethod
+from typing import Dict, Iterable, Iterator, List, Optional
+
+# Characters of content kept in a summary, enough for the UI's preview
+SUMMARY_PREVIEW_CHARS = 400
+
+
+def summarize(result: Dict) -> Dict:
+    """Lightweight view of a result: everything the UI lists, without the
+    page text, chunks or links"""
+    summary = {
+        'url': result['url'],
+        'title': result.get('title', ''),
+        'status': result['status'],
+        'length': result.get('length', len(result.get('content') or '')),
+        'link_count': len(result.get('links') or ()),
+        'preview': (result.get('content') or '')[:SUMMARY_PREVIEW_CHARS]
+    }
+    if 'depth' in result:
+        summary['depth'] = result['depth']
+    if result.get('duplicate_of'):
+        summary['duplicate_of'] = result['duplicate_of']
+    return summary
+
+
+class ResultStore(ABC):
+    """Ordered collection of scrape results keyed by URL.
+
+    Stores are list-like so the crawler can write into one in place of a
+    list: append() adds a result (replacing an earlier one with the same URL,
+    which keeps its position), and iterating yields full results in order.
+    summaries() lists results without their text for display.
+
+    Only the results are kept out of memory. The chatbot's BM25 index still
+    holds the text of every chunk it indexed; moving that into a store too
+    is out of scope here.
+    """
+
+    @abstractmethod
+    def append(self, result: Dict):
+        """Add a result, replacing one stored under the same URL in its position"""
+
+    def extend(self, results: Iterable[Dict]):
+        for result in results:
+            self.append(result)
+
+    @abstractmethod
+    def get(self, url: str) -> Optional[Dict]:
+        """The full result stored for a URL, or None"""
+
+    def summaries(self) -> List[Dict]:
+        return [summarize(result) for result in self]
+
+    @abstractmethod
+    def __iter__(self) -> Iterator[Dict]:
+        """Full results in the order they were first added"""
+
+    @abstractmethod
+    def __len__(self) -> int:
+        ...
+
+    def __bool__(self) -> bool:
+        return len(self) > 0
+
+    def __contains__(self, url: str) -> bool:
+        return self.get(url) is not None
+
+    @abstractmethod
+    def clear(self):
+        """Remove every result"""
+
+    def close(self):
+        pass
+
+
+class MemoryResultStore(ResultStore):
+    """Keeps results in a dict; the default for scripts and small crawls"""
+
+    def __init__(self, results: Iterable[Dict] = ()):
+        self._results: Dict[str, Dict] = {}
+        self.extend(results)
+
+    def append(self, result: Dict):
+        self._results[result['url']] = result
+
+    def get(self, url: str) -> Optional[Dict]:
+        return self._results.get(url)
+
+    def __iter__(self) -> Iterator[Dict]:
+        return iter(list(self._results.values()))
+
+    def __len__(self) -> int:
+        return len(self._results)
+
+    def clear(self):
+        self._results.clear()
+
+
+def _remove_file(path: str):
+    for suffix in ('', '-wal', '-shm'):
+        try:
+            os.remove(path + suffix)
+        except OSError:
+            pass
+
+
+class SqliteResultStore(ResultStore):
+    """Keeps results on disk in SQLite, so memory use does not grow with the
+    crawl. Summaries are stored in their own columns and are listed without
+    decoding any page.
+
+    Without a path the store uses a temporary file under ``directory`` that is
+    deleted when the store is closed or garbage collected.
+    """
+
+    def __init__(self, path: Optional[str] = None, directory: str = os.path.join('.cache', 'results')):
+        self.temporary = path is None
+        if path is None:
+            os.makedirs(directory, exist_ok=True)
+            handle, path = tempfile.mkstemp(suffix='.sqlite', dir=directory)
+            os.close(handle)
+        else:
+            parent = os.path.dirname(path)
+            if parent:
+                os.makedirs(parent, exist_ok=True)
+        self.path = path
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS results (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                url TEXT NOT NULL UNIQUE,
+                summary TEXT NOT NULL,
+                result TEXT NOT NULL
+            )
+        """)
+        self._conn.commit()
+        # Closes the connection and removes a temporary file once the store is unreachable
+        self._finalizer = weakref.finalize(self, SqliteResultStore._cleanup, self._conn,
+                                           path if self.temporary else None)
+
+    @staticmethod
+    def _cleanup(conn: sqlite3.Connection, temporary_path: Optional[str]):
+        conn.close()
+        if temporary_path:
+            _remove_file(temporary_path)
+
+    def _write(self, results: List[Dict]):
+        rows = [(result['url'], json.dumps(summarize(result)), json.dumps(result)) for result in results]
+        with self._lock:
+            self._conn.executemany("""
+                INSERT INTO results (url, summary, result) VALUES (?, ?, ?)
+                ON CONFLICT(url) DO UPDATE SET summary = excluded.summary, result = excluded.result
+            """, rows)
+            self._conn.commit()
+
+    def append(self, result: Dict):
+        self._write([result])
+
+    def extend(self, results: Iterable[Dict]):
+        # Written in small batches: results may come from a generator (a running crawl)
+        batch = []
+        for result in results:
+            batch.append(result)
+            if len(batch) >= 16:
+                self._write(batch)
+                batch = []
+        if batch:
+            self._write(batch)
+
+    def get(self, url: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute("SELECT result FROM results WHERE url = ?", (url,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def summaries(self) -> List[Dict]:
+        with self._lock:
+            rows = self._conn.execute("SELECT summary FROM results ORDER BY seq").fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def __iter__(self) -> Iterator[Dict]:
+        # Fetched in batches by sequence number so iteration never holds the whole crawl
+        last_seq = 0
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT seq, result FROM results WHERE seq > ? ORDER BY seq LIMIT 64",
+                    (last_seq,)).fetchall()
+            if not rows:
+                return
+            for seq, result in rows:
+                last_seq = seq
+                yield json.loads(result)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM results")
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._finalizer()
+
+
+class JsonlResultStore(ResultStore):
+    """Appends results to a JSON Lines file, one result per line, and keeps
+    only their file offsets and summaries in memory. An existing file is
+    reopened and indexed, so the file doubles as an export of the crawl.
+    A replaced result's old line stays in the file but is skipped."""
+
+    def __init__(self, path: str):
+        parent = os.path.dirname(path)
+        if parent:
+            os.makedirs(parent, exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = open(path, 'a+b')
+        self._offsets: Dict[str, int] = {}
+        self._summaries: Dict[str, Dict] = {}
+
+        self._file.seek(0)
+        offset = 0
+        for line in self._file:
+            if line.strip():
+                result = json.loads(line)
+                self._index(result, offset)
+            offset += len(line)
+
+    def _index(self, result: Dict, offset: int):
+        url = result['url']
+        # Reassigning an existing key keeps its first position
+        self._offsets[url] = offset
+        self._summaries[url] = summarize(result)
+
+    def append(self, result: Dict):
+        line = json.dumps(result, ensure_ascii=False).encode('utf-8') + b'\n'
+        with self._lock:
+            self._file.seek(0, os.SEEK_END)
+            offset = self._file.tell()
+            self._file.write(line)
+            self._file.flush()
+            self._index(result, offset)
+
+    def get(self, url: str) -> Optional[Dict]:
+        with self._lock:
+            offset = self._offsets.get(url)
+            if offset is None:
+                return None
+            self._file.seek(offset)
+            return json.loads(self._file.readline())
+
+    def summaries(self) -> List[Dict]:
+        with self._lock:
+            return list(self._summaries.values())
+
+    def __iter__(self) -> Iterator[Dict]:
+        with self._lock:
+            urls = list(self._offsets)
+        for url in urls:
+            result = self.get(url)
+            if result is not None:
+                yield result
+
+    def __len__(self) -> int:
+        return len(self._offsets)
+
+    def clear(self):
+        with self._lock:
+            self._file.truncate(0)
+            self._offsets.clear()
+            self._summaries.clear()
+
+    def close(self):
+        with self._lock:
+            self._file.close()
@@ -0,0 +1,137 @@
+import heapq
+import math
+import re
+from collections import Counter
+from typing import Dict, List, Optional
+
+from documents import CHUNK_OVERLAP, CHUNK_SIZE, build_chunks
+
+_TOKEN_RE = re.compile(r'\w+')
+
+# Very common English words carry no signal for ranking
+STOPWORDS = frozenset("""
+a an and are as at be but by for from has have how i in is it its of on or that the this
+to was were what when where which who why will with you your about can do does
+""".split())
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens with stopwords removed"""
+    return [token for token in _TOKEN_RE.findall(text.lower()) if token not in STOPWORDS]
+
+
+def chunk_text(text: str, chunk_size: int = CHUNK_SIZE, overlap: int = CHUNK_OVERLAP) -> List[str]:
+    """Split text into chunks of about chunk_size characters, breaking on
+    whitespace, with `overlap` characters repeated between neighbours"""
+    builder = build_chunks('', [text.strip()], chunk_size=chunk_size, overlap=overlap)
+    return [chunk['text'] for chunk in builder.chunks]
+
+
+class BM25Index:
+    """Okapi BM25 over page chunks.
+
+    Each chunk is stored with its source metadata (url, title) and scored
+    against a query with the usual BM25 formula. Postings are kept per term,
+    so a search only touches chunks that share a term with the query.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.chunks: Dict[int, Dict] = {}
+        # url -> ids of the chunks indexed for that page
+        self._page_chunks: Dict[str, List[int]] = {}
+        self._postings: Dict[str, Dict[int, int]] = {}
+        self._lengths: Dict[int, int] = {}
+        self._total_length = 0
+        self._next_id = 0
+
+    def __len__(self) -> int:
+        return len(self.chunks)
+
+    def add(self, text: str, **metadata) -> int:
+        """Index one chunk and return its id"""
+        chunk_id = self._next_id
+        self._next_id += 1
+
+        terms = Counter(tokenize(text))
+        for term, count in terms.items():
+            self._postings.setdefault(term, {})[chunk_id] = count
+        length = sum(terms.values())
+        self._lengths[chunk_id] = length
+        self._total_length += length
+        self.chunks[chunk_id] = dict(metadata, text=text)
+        return chunk_id
+
+    def remove(self, chunk_id: int):
+        """Drop one chunk from the index"""
+        chunk = self.chunks.pop(chunk_id, None)
+        if chunk is None:
+            return
+        for term in set(tokenize(chunk['text'])):
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(chunk_id, None)
+                if not postings:
+                    del self._postings[term]
+        self._total_length -= self._lengths.pop(chunk_id)
+
+    def add_page(self, item: Dict, chunk_size: int = CHUNK_SIZE) -> List[int]:
+        """Index a scraped page (a scraper/PDF result dict) by its chunks,
+        chunking its content when it has none. A page already indexed under
+        the same URL is replaced."""
+        self.remove_page(item['url'])
+        chunks = item.get('chunks')
+        if chunks:
+            chunk_ids = [self.add(chunk['text'], url=item['url'], title=item['title'],
+                                  chunk_id=chunk['id'], start=chunk['start'], end=chunk['end'],
+                                  depth=chunk['depth'])
+                         for chunk in chunks]
+        else:
+            chunk_ids = [self.add(chunk, url=item['url'], title=item['title'])
+                         for chunk in chunk_text(item['content'], chunk_size=chunk_size)]
+        self._page_chunks[item['url']] = chunk_ids
+        return chunk_ids
+
+    def remove_page(self, url: str):
+        """Drop every chunk indexed for a page"""
+        for chunk_id in self._page_chunks.pop(url, []):
+            self.remove(chunk_id)
+
+    def search(self, query: str, k: int = 6) -> List[Dict]:
+        """Top-k chunks for the query, best first. Each hit is the chunk's
+        metadata plus 'text', 'id' and 'score'."""
+        if not self.chunks:
+            return []
+
+        n = len(self.chunks)
+        average_length = self._total_length / n or 1.0
+        scores: Dict[int, float] = {}
+        for term in set(tokenize(query)):
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+            for chunk_id, tf in postings.items():
+                norm = tf + self.k1 * (1 - self.b + self.b * self._lengths[chunk_id] / average_length)
+                scores[chunk_id] = scores.get(chunk_id, 0.0) + idf * tf * (self.k1 + 1) / norm
+
+        best = heapq.nlargest(k, scores.items(), key=lambda pair: pair[1])
+        return [dict(self.chunks[chunk_id], id=chunk_id, score=score) for chunk_id, score in best]
+
+    def leading_chunks(self, k: int = 6, exclude: Optional[set] = None) -> List[Dict]:
+        """First chunk of each page (then second, ...) for questions with no
+        lexical overlap, such as 'summarize the site'"""
+        exclude = exclude or set()
+        by_url = self._page_chunks
+
+        picked: List[Dict] = []
+        rank = 0
+        while len(picked) < k and any(len(ids) > rank for ids in by_url.values()):
+            for ids in by_url.values():
+                if len(ids) > rank and ids[rank] not in exclude:
+                    picked.append(dict(self.chunks[ids[rank]], id=ids[rank], score=0.0))
+                    if len(picked) >= k:
+                        break
+            rank += 1
+        return picked
@@ -1,171 +1,138 @@
 import requests
-from bs4 import BeautifulSoup
-from urllib.parse import urljoin, urlparse, urlunparse, parse_qsl, urlencode
-import time
-from typing import Dict, List, Optional, Set
+from requests.adapters import HTTPAdapter
+from urllib.parse import urljoin, urlparse
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+import uuid
 import urllib3
+from crawl_state import CrawlStateStore
+from host_scheduler import HostScheduler
+from frontier import CrawlFrontier
+from http_cache import ResponseCache
+from documents import document_text
+from html_extract import charset_from_content_type, extract_document
+from near_duplicates import SimHashIndex, simhash
+from url_utils import normalize_url, site_key
+from instrumentation import MemorySink, incr, span
 
 # Suppress SSL warnings for testing
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
-class WebScraper:
-    def __init__(self, delay: float = 1.0, max_depth: int = 1, max_pages: int = 10):
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-        })
+# Responses with any other declared Content-Type are dropped without downloading the body
+HTML_CONTENT_TYPES = ('text/html', 'application/xhtml+xml')
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+
+class BaseScraper:
+    """Configuration, parsing and link handling shared by the sync and async scrapers.
+    Subclasses provide the HTTP transport and the crawl loops."""
+    
+    def __init__(self, delay: float = 1.0, max_depth: int = 1, max_pages: int = 10,
+                 cache: Optional[ResponseCache] = None, parser_backend: Optional[str] = None,
+                 max_bytes: int = 2 * 1024 * 1024, state_store: Optional[CrawlStateStore] = None,
+                 detect_duplicates: bool = True, skip_duplicate_links: bool = False):
+        # Byte ceiling for a single response body; anything beyond it is never downloaded
+        self.max_bytes = max_bytes
+        # HTML parser backend ('selectolax', 'lxml' or 'bs4'); None picks the fastest installed
+        self.parser_backend = parser_backend
+        # Optional on-disk response cache used for conditional revalidation
+        self.cache = cache
         self.delay = delay
         self.max_depth = max_depth
         self.max_pages = max_pages
         self.visited_urls: Set[str] = set()
         self.scraped_count = 0
+        # Per-host politeness scheduler, provided by the subclass
+        self.scheduler: Optional[HostScheduler] = None
+        # Optional persistent crawl state; depth crawls checkpoint into it and can be resumed
+        self.state_store = state_store
+        self.crawl_id: Optional[str] = None
+        # Span timings of this scraper, collected while instrumentation is enabled
+        self.timings = MemorySink()
+        # Near-duplicate pages (SimHash within a crawl) get 'duplicate_of' set; with
+        # skip_duplicate_links their links are not followed either
+        self.detect_duplicates = detect_duplicates
+        self.skip_duplicate_links = skip_duplicate_links
+        self.fingerprints = SimHashIndex()
+        self.duplicate_count = 0
     
     def _normalize_url(self, url: str) -> str:
-        """Normalize URLs for consistent comparison and storage.
-        - Lowercase scheme and host
-        - Remove fragment
-        - Remove default ports
-        - Strip common tracking query params
-        - Remove trailing slash (except root)
-        """
-        try:
-            parsed = urlparse(url)
-            scheme = parsed.scheme.lower()
-            hostname = (parsed.hostname or '').lower()
-            # Drop leading www. for same-site comparisons
-            hostname = hostname.lstrip('www.')
-            port = parsed.port
-            # Remove default ports
-            netloc = hostname
-            if port and not ((scheme == 'http' and port == 80) or (scheme == 'https' and port == 443)):
-                netloc = f"{hostname}:{port}"
-
-            # Clean query: drop tracking params
-            query_pairs = [(k, v) for k, v in parse_qsl(parsed.query, keep_blank_values=True)]
-            drop_keys = {'utm_source', 'utm_medium', 'utm_campaign', 'utm_term', 'utm_content', 'gclid', 'fbclid'}
-            cleaned_pairs = [(k, v) for k, v in query_pairs if k.lower() not in drop_keys]
-            # Keep original order
-            query = urlencode(cleaned_pairs)
-
-            # Remove fragment
-            fragment = ''
-
-            # Normalize path: remove trailing slash except root
-            path = parsed.path or '/'
-            if len(path) > 1 and path.endswith('/'):
-                path = path.rstrip('/')
-
-            normalized = urlunparse((scheme, netloc, path, '', query, fragment))
-            return normalized
-        except Exception:
-            return url
+        """Normalize URLs for consistent comparison and storage (memoized, see url_utils)"""
+        return normalize_url(url)
 
     def _is_same_site(self, url: str, base_url: str) -> bool:
         """Heuristic same-site check tolerant of www and subdomains."""
-        a = urlparse(url)
-        b = urlparse(base_url)
-        host_a = (a.hostname or '').lower().lstrip('www.')
-        host_b = (b.hostname or '').lower().lstrip('www.')
-        return host_a == host_b
+        return site_key(url) == site_key(base_url)
     
-    def scrape_url(self, url: str, extract_links: bool = False) -> Dict[str, str]:
-        """Scrape content from a single URL"""
-        try:
-            normalized_url = self._normalize_url(url)
-            response = self.session.get(normalized_url, timeout=10, verify=False)
-            response.raise_for_status()
-            
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            # Extract links if requested
-            links = []
-            if extract_links:
-                links = self._extract_links(soup, url)
-            
-            # Remove script and style elements
-            for script in soup(["script", "style"]):
-                script.decompose()
-            
-            # Extract title
-            title = soup.find('title')
-            title_text = title.get_text().strip() if title else "No title"
-            
-            # Extract main content
-            content = soup.get_text()
-            # Clean up whitespace
-            lines = (line.strip() for line in content.splitlines())
-            chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
-            content = ' '.join(chunk for chunk in chunks if chunk)
-            
-            result = {
-                'url': normalized_url,
-                'title': title_text,
-                'content': content[:10000],  # Limit content length
-                'status': 'success'
-            }
-            
-            if extract_links:
-                result['links'] = links
-            
-            return result
-            
-        except Exception as e:
-            return {
-                'url': self._normalize_url(url),
-                'title': '',
-                'content': '',
-                'status': f'error: {str(e)}',
-                'links': [] if extract_links else None
-            }
+    @staticmethod
+    def _check_content_type(content_type: str):
+        """Reject responses that declare a non-HTML Content-Type"""
+        mime_type = content_type.split(';')[0].strip().lower()
+        if mime_type and mime_type not in HTML_CONTENT_TYPES:
+            raise ValueError(f"unsupported content type {mime_type}")
     
-    def _extract_links(self, soup: BeautifulSoup, base_url: str) -> List[str]:
-        """Extract and normalize links from a page"""
-        links = []
-        base_domain = urlparse(base_url).hostname or ''
-        base_domain = base_domain.lower().lstrip('www.')
+    def _build_result(self, url: str, normalized_url: str, body: bytes, extract_links: bool,
+                      depth: Optional[int] = None, content_type: Optional[str] = None) -> Dict[str, str]:
+        """Turn a downloaded page into the scraper's result dict (see documents.py).
+        The charset of content_type, if any, takes precedence over <meta charset>."""
+        # Title, chunked text and links come out of a single parse
+        with span('parse', self.timings):
+            title_text, document, hrefs = extract_document(body, normalized_url, depth=depth,
+                                                           want_links=extract_links,
+                                                           backend=self.parser_backend,
+                                                           encoding=charset_from_content_type(content_type))
         
-        # Extract from various link sources
-        link_selectors = [
-            'a[href]',  # Standard links
-            'area[href]',  # Image map areas
-            'link[href]',  # Link elements
-        ]
+        result = {
+            'url': normalized_url,
+            'title': title_text,
+            'content': document.preview,  # First PREVIEW_CHARS characters
+            'status': 'success',
+            'length': document.length,
+            'chunks': document.chunks
+        }
         
-        for selector in link_selectors:
-            for element in soup.select(selector):
-                href = element.get('href')
-                if not href:
-                    continue
-                    
-                # Convert relative URLs to absolute and normalize
-                candidate = self._normalize_url(urljoin(base_url, href))
+        if self.detect_duplicates:
+            with span('fingerprint', self.timings):
+                fingerprint = simhash(document_text(result))
+            if fingerprint is not None:
+                result['simhash'] = f'{fingerprint:016x}'
+        
+        if extract_links:
+            result['links'] = self._extract_links(hrefs, url)
+        
+        return result
+    
+    def _error_result(self, url: str, error: Exception, extract_links: bool) -> Dict[str, str]:
+        incr('pages.errors', collector=self.timings)
+        return {
+            'url': self._normalize_url(url),
+            'title': '',
+            'content': '',
+            'status': f'error: {str(error)}',
+            'chunks': [],
+            'links': [] if extract_links else None
+        }
+    
+    def _extract_links(self, hrefs: List[str], base_url: str) -> List[str]:
+        """Resolve, normalize and filter raw hrefs found on a page"""
+        # Convert relative URLs to absolute and normalize
+        with span('normalize', self.timings):
+            candidates = [normalize_url(urljoin(base_url, href)) for href in dict.fromkeys(hrefs)]
+        
+        links = []
+        base_site = site_key(base_url)
+        with span('links', self.timings):
+            for candidate in candidates:
                 parsed_url = urlparse(candidate)
                 
                 # Only include HTTP/HTTPS links from the same site
                 if (parsed_url.scheme in ['http', 'https'] and 
-                    self._is_same_site(candidate, base_url) and
+                    site_key(candidate) == base_site and
                     candidate not in self.visited_urls and
                     self._is_valid_link(candidate)):
                     links.append(candidate)
         
-        # Also look for links in navigation menus, content areas
-        nav_links = soup.select('nav a[href], .menu a[href], .navigation a[href], .nav a[href]')
-        content_links = soup.select('main a[href], .content a[href], article a[href], section a[href]')
-        
-        for link_set in [nav_links, content_links]:
-            for link in link_set:
-                href = link.get('href')
-                if href:
-                    candidate = self._normalize_url(urljoin(base_url, href))
-                    parsed_url = urlparse(candidate)
-                    
-                    if (parsed_url.scheme in ['http', 'https'] and 
-                        self._is_same_site(candidate, base_url) and
-                        candidate not in self.visited_urls and
-                        self._is_valid_link(candidate)):
-                        links.append(candidate)
-        
-        return list(set(links))  # Remove duplicates
+        return list(dict.fromkeys(links))  # Remove duplicates, keep page order
     
     def _is_valid_link(self, url: str) -> bool:
         """Check if a link should be followed"""
@@ -196,75 +163,320 @@ class WebScraper:
             
         return True
     
-    def scrape_multiple_urls(self, urls: List[str]) -> List[Dict[str, str]]:
-        """Scrape content from multiple URLs (single level only)"""
-        results = []
-        for url in urls:
-            result = self.scrape_url(url, extract_links=False)
-            results.append(result)
-            time.sleep(self.delay)  # Be respectful to servers
-        return results
+    def _enqueue_links(self, frontier: CrawlFrontier, links: List[str],
+                       depth: int) -> List[Tuple[str, int]]:
+        """Queue up to 3 navigation-style and 7 content links found on a page.
+        Links are already normalized by _extract_links. Returns what was queued."""
+        nav_links = [link for link in links if CrawlFrontier.is_priority_link(link)]
+        content_links = [link for link in links if not CrawlFrontier.is_priority_link(link)]
+        
+        pushed = []
+        for link in nav_links[:3] + content_links[:7]:
+            if link not in self.visited_urls and frontier.push(link, depth):
+                pushed.append((link, depth))
+        return pushed
     
-    def scrape_with_depth(self, start_urls: List[str], depth: int = 2) -> List[Dict[str, str]]:
-        """Scrape URLs with specified depth level"""
+    def _start_crawl(self, start_urls: List[str], depth: int,
+                     crawl_id: Optional[str] = None) -> CrawlFrontier:
+        """Reset crawl state and seed a frontier with the normalized start URLs.
+        With a state store the crawl is registered under crawl_id (or a new id)."""
         self.max_depth = depth
         self.visited_urls.clear()
         self.scraped_count = 0
+        self._reset_duplicates()
         
-        results = []
-        # Seed queue with normalized URLs
-        urls_to_process = [(self._normalize_url(url), 0) for url in start_urls]  # (url, current_depth)
+        frontier = CrawlFrontier(self.scheduler)
+        seeds = []
+        for url in start_urls:
+            normalized_url = self._normalize_url(url)
+            if frontier.push(normalized_url, 0):
+                seeds.append((normalized_url, 0))
         
-        while urls_to_process and self.scraped_count < self.max_pages:
-            current_url, current_depth = urls_to_process.pop(0)
-            
-            # Skip if already visited
-            if current_url in self.visited_urls:
-                continue
-                
-            # Mark as visited
-            self.visited_urls.add(current_url)
-            
-            print(f"Scraping (depth {current_depth}): {current_url}")
-            
-            # Scrape the current URL
-            extract_links = current_depth < self.max_depth
-            result = self.scrape_url(current_url, extract_links=extract_links)
-            result['depth'] = current_depth
-            results.append(result)
-            
-            self.scraped_count += 1
-            
-            # If successful and not at max depth, add found links to queue
-            if (result['status'] == 'success' and 
-                current_depth < self.max_depth and 
-                'links' in result and 
-                result['links']):
-                
-                # Prioritize different types of links
-                nav_links = [self._normalize_url(link) for link in result['links'] if any(word in link.lower() for word in ['about', 'service', 'product', 'contact'])]
-                content_links = [self._normalize_url(link) for link in result['links'] if self._normalize_url(link) not in nav_links]
-                
-                # Add navigation links first (higher priority)
-                for link in nav_links[:3]:
-                    if link not in self.visited_urls:
-                        urls_to_process.append((link, current_depth + 1))
-                
-                # Then add content links
-                for link in content_links[:7]:  # Increased from 5 to 7
-                    if link not in self.visited_urls:
-                        urls_to_process.append((link, current_depth + 1))
-            
-            # Respectful delay
-            time.sleep(self.delay)
+        if self.state_store is not None:
+            self.crawl_id = crawl_id or uuid.uuid4().hex
+            self.state_store.start_crawl(self.crawl_id, list(start_urls), depth, self.max_pages)
+            self.state_store.record_pushed(self.crawl_id, seeds)
+        return frontier
+    
+    def _resume_crawl(self, crawl_id: str) -> CrawlFrontier:
+        """Rebuild crawl state from the state store and return the frontier.
+        Results stored so far are read with state_store.iter_results."""
+        if self.state_store is None:
+            raise ValueError("Resuming a crawl requires a state_store")
+        state = self.state_store.load(crawl_id)
         
-        return results
+        self.crawl_id = crawl_id
+        self.max_depth = state['max_depth']
+        self.max_pages = state['max_pages']
+        self.visited_urls.clear()
+        self.visited_urls.update(state['visited'])
+        self.scraped_count = len(self.visited_urls)
+        self._reset_duplicates()
+        if self.scheduler is not None:
+            self.scheduler.restore_hosts(state['hosts'])
+        
+        frontier = CrawlFrontier(self.scheduler)
+        for url in self.visited_urls:
+            frontier.mark_seen(url)
+        for url, depth in state['frontier']:
+            frontier.push(url, depth)
+        return frontier
+    
+    def _take_next(self, frontier: CrawlFrontier):
+        """Pop the next (url, depth) and mark it visited so no other worker picks it up"""
+        url, depth = frontier.pop()
+        self.visited_urls.add(url)
+        self.scraped_count += 1
+        if self.state_store is not None:
+            self.state_store.record_taken(self.crawl_id, url, depth)
+        return url, depth
+    
+    def _follow_links(self, frontier: CrawlFrontier, result: Dict[str, str],
+                      depth: int) -> List[Tuple[str, int]]:
+        """If successful and not at max depth, add found links to the frontier"""
+        if (result['status'] == 'success' and 
+            depth < self.max_depth and 
+            'links' in result and 
+            result['links']):
+            return self._enqueue_links(frontier, result['links'], depth + 1)
+        return []
+    
+    def _finish_page(self, frontier: CrawlFrontier, result: Dict[str, str], depth: int):
+        """Check a fetched page for duplicates, follow its links and checkpoint it
+        to the state store"""
+        if self._mark_duplicate(result) and self.skip_duplicate_links:
+            pushed = []
+        else:
+            pushed = self._follow_links(frontier, result, depth)
+        if self.state_store is not None:
+            hosts = None
+            if self.scheduler is not None:
+                hosts = self.scheduler.export_hosts([HostScheduler.host_of(result['url'])])
+            self.state_store.record_result(self.crawl_id, result, pushed, hosts)
+    
+    def _reset_duplicates(self):
+        self.fingerprints.clear()
+        self.duplicate_count = 0
+    
+    def _mark_duplicate(self, result: Dict[str, str]) -> bool:
+        """Compare a finished page with the pages seen so far. A near-duplicate gets
+        'duplicate_of' set to the URL of the first page with the same content;
+        any other page is remembered."""
+        if 'simhash' not in result:
+            return False
+        original = self.fingerprints.add_or_find(int(result['simhash'], 16), result['url'])
+        if original is None or original == result['url']:
+            return False
+        result['duplicate_of'] = original
+        self.duplicate_count += 1
+        incr('pages.duplicates', collector=self.timings)
+        return True
+    
+    def _end_crawl(self):
+        if self.state_store is not None:
+            self.state_store.finish_crawl(self.crawl_id)
+    
+    def _interrupt_crawl(self):
+        """The crawl stopped early (generator closed or a page failed): release it for resuming"""
+        if self.state_store is not None:
+            self.state_store.interrupt_crawl(self.crawl_id)
     
-    def get_scraping_stats(self) -> Dict[str, int]:
-        """Get statistics about the scraping session"""
+    def get_scraping_stats(self) -> Dict:
+        """Get statistics about the scraping session. 'timings' summarizes the
+        instrumentation spans (fetch, parse, normalize, links, ...) and is empty
+        unless instrumentation is enabled."""
         return {
             'total_pages_scraped': self.scraped_count,
             'total_urls_visited': len(self.visited_urls),
             'max_depth_configured': self.max_depth,
-            'max_pages_configured': self.max_pages
-        }
\ No newline at end of file
+            'max_pages_configured': self.max_pages,
+            'duplicate_pages': self.duplicate_count,
+            'timings': self.timings.summary()
+        }
+
+
+class WebScraper(BaseScraper):
+    def __init__(self, delay: float = 1.0, max_depth: int = 1, max_pages: int = 10,
+                 max_workers: int = 4, respect_robots: bool = True,
+                 cache: Optional[ResponseCache] = None, parser_backend: Optional[str] = None,
+                 max_bytes: int = 2 * 1024 * 1024, session: Optional[requests.Session] = None,
+                 state_store: Optional[CrawlStateStore] = None, detect_duplicates: bool = True,
+                 skip_duplicate_links: bool = False):
+        super().__init__(delay=delay, max_depth=max_depth, max_pages=max_pages, cache=cache,
+                         parser_backend=parser_backend, max_bytes=max_bytes,
+                         state_store=state_store, detect_duplicates=detect_duplicates,
+                         skip_duplicate_links=skip_duplicate_links)
+        self.max_workers = max(1, max_workers)
+        if session is None:
+            session = requests.Session()
+            # Size the connection pool so every worker can keep a connection alive
+            adapter = HTTPAdapter(pool_connections=self.max_workers, pool_maxsize=self.max_workers)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+        # A session passed in (e.g. resources.get_http_session()) keeps its own pool and
+        # its connections outlive this scraper
+        self.session = session
+        self.session.headers.update({'User-Agent': USER_AGENT})
+        # Per-host politeness (delay and robots.txt Crawl-delay)
+        self.scheduler = HostScheduler(delay=delay, session=self.session, user_agent=USER_AGENT,
+                                       respect_robots=respect_robots)
+    
+    def _fetch(self, url: str) -> Tuple[bytes, str]:
+        """GET a URL, revalidating against the response cache when one is configured.
+        The body is streamed and capped at max_bytes; non-HTML responses are rejected
+        from their Content-Type header, before any of the body is read.
+        Returns (body, Content-Type header)."""
+        cached = self.cache.get(url) if self.cache else None
+        headers = ResponseCache.conditional_headers(cached)
+        
+        # With stream=True, get() returns once the headers are in
+        with span('fetch.wait', self.timings):
+            response = self.session.get(url, timeout=10, verify=False, headers=headers, stream=True)
+        with response:
+            if cached and response.status_code == 304:
+                self.cache.touch(url)
+                incr('fetch.not_modified', collector=self.timings)
+                return cached['body'], cached['content_type']
+            
+            response.raise_for_status()
+            
+            content_type = response.headers.get('Content-Type', '')
+            self._check_content_type(content_type)
+            
+            # Read the (decoded) body incrementally and stop at the ceiling; Content-Length
+            # is not used as a limit since it counts compressed bytes
+            chunks = []
+            received = 0
+            with span('fetch.body', self.timings):
+                for chunk in response.iter_content(chunk_size=64 * 1024):
+                    chunks.append(chunk)
+                    received += len(chunk)
+                    if received >= self.max_bytes:
+                        break
+            body = b''.join(chunks)[:self.max_bytes]
+            incr('fetch.bytes', len(body), collector=self.timings)
+        
+        if self.cache:
+            self.cache.put(url, body,
+                           etag=response.headers.get('ETag'),
+                           last_modified=response.headers.get('Last-Modified'),
+                           content_type=content_type)
+        return body, content_type
+    
+    def scrape_url(self, url: str, extract_links: bool = False,
+                   depth: Optional[int] = None) -> Dict[str, str]:
+        """Scrape content from a single URL"""
+        try:
+            normalized_url = self._normalize_url(url)
+            with span('fetch', self.timings):
+                body, content_type = self._fetch(normalized_url)
+            return self._build_result(url, normalized_url, body, extract_links, depth, content_type)
+        except Exception as e:
+            return self._error_result(url, e, extract_links)
+    
+    def iter_scrape_multiple_urls(self, urls: List[str]) -> Iterator[Dict[str, str]]:
+        """Scrape content from multiple URLs (single level only), yielding each
+        result as soon as it is fetched. URLs are fetched in the order their
+        hosts become ready, and each URL only once."""
+        for _, result in self._iter_scrape_pairs(urls):
+            yield result
+    
+    def _iter_scrape_pairs(self, urls: List[str]) -> Iterator[Tuple[str, Dict[str, str]]]:
+        """(input URL, result) pairs; result['url'] is normalized and may differ"""
+        self._reset_duplicates()
+        for url in self.scheduler.iter_ready(dict.fromkeys(urls)):
+            result = self.scrape_url(url, extract_links=False)
+            self._mark_duplicate(result)
+            yield url, result
+    
+    def scrape_multiple_urls(self, urls: List[str]) -> List[Dict[str, str]]:
+        """Scrape content from multiple URLs (single level only); results keep input order"""
+        results_by_url = dict(self._iter_scrape_pairs(urls))
+        return [results_by_url[url] for url in urls]
+    
+    def _crawl_page(self, url: str, depth: int) -> Dict[str, str]:
+        """Fetch a single frontier URL on a worker thread"""
+        self.scheduler.wait(url)
+        print(f"Scraping (depth {depth}): {url}")
+        
+        extract_links = depth < self.max_depth
+        result = self.scrape_url(url, extract_links=extract_links, depth=depth)
+        result['depth'] = depth
+        return result
+    
+    def scrape_with_depth(self, start_urls: List[str], depth: int = 2,
+                          crawl_id: Optional[str] = None, result_store=None) -> List[Dict[str, str]]:
+        """Scrape URLs with specified depth level.
+        Up to max_workers pages are fetched concurrently; the delay is applied per host.
+        With a state_store the crawl is checkpointed under crawl_id (see resume).
+        Results are collected in a list, or written to result_store (see
+        result_store.py) as they finish, and that store is returned."""
+        results = result_store if result_store is not None else []
+        results.extend(self.iter_scrape_with_depth(start_urls, depth, crawl_id))
+        return results
+    
+    def iter_scrape_with_depth(self, start_urls: List[str], depth: int = 2,
+                               crawl_id: Optional[str] = None) -> Iterator[Dict[str, str]]:
+        """Generator version of scrape_with_depth: yields each page's result as
+        soon as it finishes, so callers can show or index pages while the crawl
+        goes on. Closing the generator early stops the crawl after the pages in
+        flight; with a state_store it can then be resumed."""
+        frontier = self._start_crawl(start_urls, depth, crawl_id)
+        return self._iter_crawl(frontier)
+    
+    def resume(self, crawl_id: str, result_store=None) -> List[Dict[str, str]]:
+        """Continue an interrupted depth crawl from the state store.
+        Pages finished before the interruption are not fetched again; the returned
+        list (or result_store) holds their results followed by the new ones."""
+        results = result_store if result_store is not None else []
+        results.extend(self.iter_resume(crawl_id))
+        return results
+    
+    def iter_resume(self, crawl_id: str) -> Iterator[Dict[str, str]]:
+        """Generator version of resume: yields the stored results, then new ones
+        as they finish. The crawl is taken over when this is called, so one that
+        is still running elsewhere raises ValueError here (see CrawlStateStore.load)."""
+        frontier = self._resume_crawl(crawl_id)
+        return self._iter_resumed(crawl_id, frontier)
+    
+    def _iter_resumed(self, crawl_id: str, frontier: CrawlFrontier) -> Iterator[Dict[str, str]]:
+        try:
+            for result in self.state_store.iter_results(crawl_id):
+                # Pages crawled before the interruption still count for duplicate detection
+                self._mark_duplicate(result)
+                yield result
+        except BaseException:
+            self._interrupt_crawl()
+            raise
+        yield from self._iter_crawl(frontier)
+    
+    def _iter_crawl(self, frontier: CrawlFrontier) -> Iterator[Dict[str, str]]:
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            in_flight = {}
+            try:
+                while frontier or in_flight:
+                    # Fill free worker slots from the frontier
+                    while (frontier and len(in_flight) < self.max_workers and
+                           self.scraped_count < self.max_pages):
+                        current_url, current_depth = self._take_next(frontier)
+                        future = executor.submit(self._crawl_page, current_url, current_depth)
+                        in_flight[future] = current_depth
+                    
+                    if not in_flight:
+                        break
+                    
+                    done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        current_depth = in_flight.pop(future)
+                        result = future.result()
+                        self._finish_page(frontier, result, current_depth)
+                        yield result
+            except BaseException:
+                self._interrupt_crawl()
+                raise
+            finally:
+                # Stopped early: don't start pages that are still queued
+                for future in in_flight:
+                    future.cancel()
+        
+        self._end_crawl()
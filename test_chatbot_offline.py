@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Offline tests of the chatbot's knowledge base (no API calls are made)
+
+    python -m pytest test_chatbot_offline.py
+"""
+
+from types import SimpleNamespace
+
+from answer_cache import AnswerCache
+from chatbot import WebChatbot
+from documents import ChunkBuilder
+
+
+def make_page(url, text, **extra):
+    builder = ChunkBuilder(url, depth=0)
+    builder.feed(text)
+    builder.close()
+    page = {'url': url, 'title': url.rsplit('/', 1)[-1], 'status': 'success',
+            'content': builder.preview, 'length': builder.length, 'chunks': builder.chunks,
+            'links': [f'{url}/next']}
+    page.update(extra)
+    return page
+
+
+def make_chatbot():
+    return WebChatbot(api_key='sk-test', validate='lazy')
+
+
+def test_knowledge_base_keeps_no_page_text_or_links():
+    chatbot = make_chatbot()
+    chatbot.upsert_documents([make_page('https://a.test/one', 'python ' * 300),
+                              make_page('https://a.test/two', 'python ' * 300,
+                                        duplicate_of='https://a.test/one')])
+    records = {record['url']: record for record in chatbot.scraped_content}
+    assert set(records['https://a.test/one']) == {'url', 'title', 'status', 'hash'}
+    assert records['https://a.test/two']['duplicate_of'] == 'https://a.test/one'
+    # The text is still searchable through the index; the duplicate is not indexed
+    assert {hit['url'] for hit in chatbot.index.search('python')} == {'https://a.test/one'}
+
+
+def test_fingerprint_changes_only_with_content():
+    chatbot = make_chatbot()
+    chatbot.add_scraped_content([make_page('https://a.test/one', 'first text')])
+    before = chatbot.content_fingerprint()
+    chatbot.upsert_documents([make_page('https://a.test/one', 'first text', links=[])])
+    assert chatbot.content_fingerprint() == before
+    chatbot.upsert_documents([make_page('https://a.test/one', 'changed text')])
+    assert chatbot.content_fingerprint() != before
+    chatbot.add_scraped_content([])
+    assert chatbot.scraped_content == [] and not len(chatbot.index)
+
+
+class _FakeCompletions:
+    """Stands in for client.chat.completions; answers with a counter"""
+
+    def __init__(self):
+        self.calls = []
+
+    def create(self, **kwargs):
+        self.calls.append(kwargs['messages'])
+        message = SimpleNamespace(content=f'answer {len(self.calls)}')
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+
+def test_follow_up_is_not_answered_from_another_conversation():
+    # Two sessions share one answer cache, as in the app
+    cache = AnswerCache()
+    chatbots = [WebChatbot(api_key='sk-test', validate='lazy', answer_cache=cache) for _ in range(2)]
+    completions = _FakeCompletions()
+    for chatbot, topic in zip(chatbots, ['python', 'golang']):
+        chatbot.client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+        chatbot.add_scraped_content([make_page('https://a.test/one', 'python and golang ' * 50)])
+        chatbot.ask_question(f'What does the page say about {topic}?')
+
+    answers = [chatbot.ask_question('Tell me more') for chatbot in chatbots]
+    assert len(completions.calls) == 4
+    assert answers == ['answer 3', 'answer 4']
+    assert 'golang' in completions.calls[3][1]['content']
+
+    # The same question after the same history is still served from the cache
+    repeat = WebChatbot(api_key='sk-test', validate='lazy', answer_cache=cache)
+    repeat.client = chatbots[0].client
+    repeat.add_scraped_content([make_page('https://a.test/one', 'python and golang ' * 50)])
+    repeat.ask_question('What does the page say about python?')
+    assert len(completions.calls) == 4
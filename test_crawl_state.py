@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Offline tests of crawl checkpoint leases (no internet needed)
+
+    python -m pytest test_crawl_state.py
+"""
+
+import time
+
+import pytest
+
+from crawl_state import CrawlStateStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = CrawlStateStore(path=str(tmp_path / 'crawl_state.sqlite'), stale_after=60)
+    yield store
+    store.close()
+
+
+def start(store, crawl_id='c1'):
+    store.start_crawl(crawl_id, ['https://example.com'], 1, 10)
+    store.record_pushed(crawl_id, [('https://example.com/', 0)])
+    store.record_taken(crawl_id, 'https://example.com/', 0)
+
+
+def set_updated_at(store, crawl_id, updated_at):
+    store._conn.execute("UPDATE crawls SET updated_at = ? WHERE crawl_id = ?", (updated_at, crawl_id))
+    store._conn.commit()
+
+
+def test_running_crawl_is_not_offered_or_loaded(store):
+    start(store)
+    assert store.unfinished_crawls() == []
+    with pytest.raises(ValueError):
+        store.load('c1')
+    # The in-flight page was not moved back to the frontier
+    assert store._conn.execute("SELECT COUNT(*) FROM frontier").fetchone()[0] == 0
+
+
+def test_stale_crawl_can_be_resumed_once(store):
+    start(store)
+    set_updated_at(store, 'c1', time.time() - 120)
+    assert [crawl['crawl_id'] for crawl in store.unfinished_crawls()] == ['c1']
+
+    state = store.load('c1')
+    assert state['frontier'] == [('https://example.com/', 0)]
+    # Loading took the lease over
+    assert store.unfinished_crawls() == []
+    with pytest.raises(ValueError):
+        store.load('c1')
+
+
+def test_interrupted_crawl_can_be_resumed_at_once(store):
+    start(store)
+    store.interrupt_crawl('c1')
+    assert [crawl['crawl_id'] for crawl in store.unfinished_crawls()] == ['c1']
+    assert store.load('c1')['status'] == 'interrupted'
+
+
+def test_prune_drops_abandoned_running_crawls(store):
+    start(store, 'old')
+    start(store, 'new')
+    set_updated_at(store, 'old', time.time() - store.ttl - 1)
+    store.prune()
+    assert store.is_unfinished('new')
+    with pytest.raises(KeyError):
+        store.load('old')
@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+"""
+Offline tests of document chunking
+
+    python -m pytest test_documents.py
+"""
+
+import random
+
+import pytest
+
+from documents import ChunkBuilder, build_chunks, document_text
+
+
+def _random_text(seed, words=2000):
+    rng = random.Random(seed)
+    vocabulary = ['alpha', 'beta', 'gamma', 'delta', 'a', 'longerwordhere', '\n', 'x' * 40]
+    return ' '.join(rng.choice(vocabulary) for _ in range(words))
+
+
+@pytest.mark.parametrize('piece_size', [1, 7, 100, 799, 800, 801, 5000])
+def test_chunk_builder_streaming_matches_whole_text(piece_size):
+    text = _random_text(piece_size)
+    whole = build_chunks('https://a.test', [text]).chunks
+    pieces = [text[i:i + piece_size] for i in range(0, len(text), piece_size)]
+    streamed = build_chunks('https://a.test', pieces)
+    assert streamed.chunks == whole
+    assert streamed.length == len(text)
+    assert document_text({'chunks': whole}) == text.strip()
+
+
+def test_chunk_builder_preview_is_capped():
+    builder = ChunkBuilder('https://a.test', preview_chars=10)
+    builder.feed('0123456')
+    builder.feed('789abcdef')
+    builder.close()
+    assert builder.preview == '0123456789'
@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+Offline tests of the crawl frontier
+
+    python -m pytest test_frontier.py
+"""
+
+import pytest
+
+from frontier import CrawlFrontier
+
+
+def drain(frontier):
+    order = []
+    while frontier:
+        order.append(frontier.pop())
+    return order
+
+
+def test_frontier_enqueues_each_url_once():
+    frontier = CrawlFrontier()
+    assert frontier.push('https://a.test/x', 1)
+    assert not frontier.push('https://a.test/x', 2)
+    frontier.mark_seen('https://a.test/done')
+    assert not frontier.push('https://a.test/done', 1)
+    assert len(frontier) == 1
+    assert drain(frontier) == [('https://a.test/x', 1)]
+    # Popping does not make a URL queueable again
+    assert not frontier.push('https://a.test/x', 1)
+
+
+def test_frontier_orders_by_depth_then_priority_then_insertion():
+    frontier = CrawlFrontier()
+    for url, depth in [('https://a.test/deep', 2), ('https://a.test/b', 1),
+                       ('https://a.test/c', 1), ('https://a.test/about', 1),
+                       ('https://a.test/contact', 2)]:
+        frontier.push(url, depth)
+    assert [url for url, _ in drain(frontier)] == [
+        'https://a.test/about', 'https://a.test/b', 'https://a.test/c',
+        # A priority link is boosted within its depth, not above shallower pages
+        'https://a.test/contact', 'https://a.test/deep']
+
+
+def test_empty_frontier_pop_raises():
+    with pytest.raises(IndexError):
+        CrawlFrontier().pop()
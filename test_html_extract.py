@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Offline tests that every installed parser backend extracts the same title,
+text and links
+
+    python -m pytest test_html_extract.py
+"""
+
+import pytest
+
+from html_extract import available_backends, extract_document
+
+DOCUMENTS = {
+    'markup': b'''<!DOCTYPE html><html><head><title> Page  title </title>
+<style>p { color: red }</style><script>var hidden = "script text";</script></head>
+<body><h1>Heading</h1><p>Visible <b>bold</b> text<!-- a comment --> after<?pi x?> pi</p>
+<template><p>Template text</p><a href="/in-template">no</a></template> template tail
+<noscript>No script</noscript><div><![CDATA[cdata text]]></div>
+<ul><li>One</li><li>Two   spaced    out</li></ul>
+<a href="/one">One</a> <area href="/map"> <link href="/style.css">
+<pre>  line one
+  line two  </pre></body></html>''',
+    'no title': b'<html><body><p>Just text</p></body></html>',
+    'meta charset': '<html><head><meta charset="iso-8859-1"><title>Café</title></head>'
+                    '<body>Müller &amp; Söhne</body></html>'.encode('iso-8859-1'),
+    'long': ('<html><body>' + ''.join(f'<p>Paragraph {n} ' + 'word ' * 40 + '</p>' for n in range(100)) +
+             '</body></html>').encode('utf-8'),
+}
+OTHER_BACKENDS = [backend for backend in available_backends() if backend != 'bs4']
+
+
+def extract(body, backend):
+    title, builder, hrefs = extract_document(body, 'https://a.test/', want_links=True, backend=backend)
+    return title, builder.chunks, hrefs
+
+
+@pytest.mark.parametrize('backend', OTHER_BACKENDS)
+@pytest.mark.parametrize('name', list(DOCUMENTS))
+def test_backends_match_beautifulsoup(name, backend):
+    assert extract(DOCUMENTS[name], backend) == extract(DOCUMENTS[name], 'bs4')
+
+
+@pytest.mark.parametrize('backend', available_backends())
+def test_invisible_text_is_skipped(backend):
+    title, chunks, hrefs = extract(DOCUMENTS['markup'], backend)
+    text = ' '.join(chunk['text'] for chunk in chunks)
+    assert title == 'Page  title'
+    for hidden in ('script text', 'color: red', 'Template text', 'a comment'):
+        assert hidden not in text
+    assert 'text after pi template tail' in text
+    assert hrefs == ['/one', '/map', '/style.css']
+
+
+@pytest.mark.parametrize('backend', available_backends())
+def test_meta_charset_and_header_charset(backend):
+    title, chunks, _ = extract(DOCUMENTS['meta charset'], backend)
+    assert title == 'Café' and 'Müller & Söhne' in chunks[0]['text']
+    title, _, _ = extract_document('<title>Grüße</title>'.encode('iso-8859-1'), 'https://a.test/',
+                                   backend=backend, encoding='ISO-8859-1')
+    assert title == 'Grüße'
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Offline tests of the HTTP response cache (revalidation against a local
+server is in test_scraper_offline.py)
+
+    python -m pytest test_http_cache.py
+"""
+
+from types import SimpleNamespace
+
+import pytest
+
+import http_cache
+from http_cache import ResponseCache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = SimpleNamespace(now=1000.0)
+    monkeypatch.setattr(http_cache, 'time', SimpleNamespace(time=lambda: clock.now))
+    return clock
+
+
+def make_cache(tmp_path, **kwargs):
+    return ResponseCache(path=str(tmp_path / 'http_cache.sqlite'), **kwargs)
+
+
+def test_entry_round_trip_and_conditional_headers(tmp_path, clock):
+    cache = make_cache(tmp_path)
+    cache.put('https://a.test/', b'<html>hi</html>', etag='"v1"', last_modified='Mon, 01 Jan 2024 00:00:00 GMT',
+              content_type='text/html; charset=iso-8859-1')
+    entry = cache.get('https://a.test/')
+    assert entry['body'] == b'<html>hi</html>'
+    assert entry['content_type'] == 'text/html; charset=iso-8859-1'
+    assert ResponseCache.conditional_headers(entry) == {
+        'If-None-Match': '"v1"', 'If-Modified-Since': 'Mon, 01 Jan 2024 00:00:00 GMT'}
+    assert ResponseCache.conditional_headers(None) == {}
+
+
+def test_responses_without_validators_are_skipped(tmp_path, clock):
+    cache = make_cache(tmp_path)
+    cache.put('https://a.test/', b'body', content_type='text/html')
+    assert cache.get('https://a.test/') is None
+
+
+def test_entries_expire_after_ttl_unless_revalidated(tmp_path, clock):
+    cache = make_cache(tmp_path, ttl=60)
+    cache.put('https://a.test/old', b'old', etag='"1"')
+    cache.put('https://a.test/kept', b'kept', etag='"2"')
+    clock.now += 50
+    cache.touch('https://a.test/kept')
+    clock.now += 20
+    assert cache.get('https://a.test/old') is None
+    assert cache.get('https://a.test/kept')['body'] == b'kept'
+
+    cache.evict()
+    assert cache._conn.execute("SELECT url FROM responses").fetchall() == [('https://a.test/kept',)]
+
+
+def test_least_recently_used_entries_are_evicted_past_max_bytes(tmp_path, clock):
+    cache = make_cache(tmp_path, max_bytes=25)
+    for name in ('a', 'b'):
+        cache.put(f'https://a.test/{name}', b'x' * 10, etag='"1"')
+        clock.now += 1
+    # Reading 'a' makes 'b' the least recently used
+    cache.get('https://a.test/a')
+    clock.now += 1
+    cache.put('https://a.test/c', b'x' * 10, etag='"1"')
+
+    assert cache.get('https://a.test/b') is None
+    assert cache.get('https://a.test/a') is not None
+    assert cache.get('https://a.test/c') is not None
+    # Bodies larger than the whole cache are never stored
+    cache.put('https://a.test/big', b'x' * 30, etag='"1"')
+    assert cache.get('https://a.test/big') is None
+
+
+def test_replacing_an_entry_counts_its_size_once(tmp_path, clock):
+    cache = make_cache(tmp_path, max_bytes=25)
+    cache.put('https://a.test/a', b'x' * 10, etag='"1"')
+    cache.put('https://a.test/a', b'y' * 10, etag='"2"')
+    cache.put('https://a.test/b', b'x' * 10, etag='"1"')
+    assert cache.get('https://a.test/a')['body'] == b'y' * 10
+    assert cache.get('https://a.test/b') is not None
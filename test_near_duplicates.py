@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""
+Offline tests of near-duplicate detection
+
+    python -m pytest test_near_duplicates.py
+"""
+
+import random
+
+from near_duplicates import MAX_DISTANCE, SimHashIndex, hamming_distance, simhash
+
+
+def test_simhash_skips_short_texts():
+    assert simhash('only a few words here') is None
+
+
+def _prose(seed, words=3000):
+    rng = random.Random(seed)
+    return [f'word{rng.randrange(5000)}' for _ in range(words)]
+
+
+def test_simhash_near_duplicates_within_threshold():
+    words = _prose(1)
+    base = simhash(' '.join(words))
+    # A page with one word changed, e.g. a different date in the footer
+    edited = words[:1500] + ['changed'] + words[1501:]
+    assert hamming_distance(base, simhash(' '.join(edited))) <= MAX_DISTANCE
+    assert hamming_distance(base, simhash(' '.join(_prose(2)))) > MAX_DISTANCE
+
+
+def test_simhash_index_threshold():
+    index = SimHashIndex()
+    fingerprint = 0x0123456789ABCDEF
+    assert index.add_or_find(fingerprint, 'https://a.test/1') is None
+    within = fingerprint ^ 0b111 << 20
+    assert index.add_or_find(within, 'https://a.test/2') == 'https://a.test/1'
+    beyond = fingerprint ^ 0b1111 << 40
+    assert index.add_or_find(beyond, 'https://a.test/3') is None
+    # Bits spread over every band still match within the threshold
+    spread = fingerprint ^ (1 << 3 | 1 << 25 | 1 << 60)
+    assert index.find(spread) == 'https://a.test/1'
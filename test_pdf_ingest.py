@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Offline tests of PDF ingestion; the PDFs are generated with PyPDF2
+
+    python -m pytest test_pdf_ingest.py
+"""
+
+import io
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from PyPDF2 import PdfWriter
+from PyPDF2.generic import DecodedStreamObject, DictionaryObject, NameObject
+
+import pdf_ingest
+from pdf_ingest import PdfParseCache, iter_parse_pdfs
+
+
+def make_pdf(texts):
+    """A PDF with one line of text per page"""
+    writer = PdfWriter()
+    font = DictionaryObject({NameObject('/Type'): NameObject('/Font'),
+                             NameObject('/Subtype'): NameObject('/Type1'),
+                             NameObject('/BaseFont'): NameObject('/Helvetica')})
+    for text in texts:
+        writer.add_blank_page(width=612, height=792)
+        page = writer.pages[-1]
+        stream = DecodedStreamObject()
+        stream.set_data(f'BT /F1 12 Tf 72 720 Td ({text}) Tj ET'.encode('latin-1'))
+        # PyPDF2 3.0 has no public way to add the content stream as an indirect object
+        page[NameObject('/Contents')] = writer._add_object(stream)
+        page[NameObject('/Resources')] = DictionaryObject({NameObject('/Font'): DictionaryObject({NameObject('/F1'): font})})
+    output = io.BytesIO()
+    writer.write(output)
+    return output.getvalue()
+
+
+PAGES = [f'Page {number} text' for number in range(7)]
+
+
+def test_long_files_are_split_into_page_ranges():
+    # 7 pages at 2 per task: one first task, then three more ranges
+    results = list(iter_parse_pdfs([('long.pdf', make_pdf(PAGES)), ('short.pdf', make_pdf(PAGES[:1]))],
+                                   pages_per_task=2))
+    by_title = {result['title']: result for result in results}
+    assert set(by_title) == {'long', 'short'}
+    assert by_title['long']['status'] == 'success'
+    assert by_title['long']['content'] == '\n'.join(PAGES)
+    assert by_title['short']['content'] == PAGES[0]
+
+
+def test_unreadable_file_gives_an_error_result():
+    results = list(iter_parse_pdfs([('broken.pdf', b'not a pdf'), ('ok.pdf', make_pdf(PAGES[:2]))]))
+    by_url = {result['url']: result for result in results}
+    assert by_url['uploaded://broken.pdf']['status'].startswith('error')
+    assert by_url['uploaded://broken.pdf']['chunks'] == []
+    assert by_url['uploaded://ok.pdf']['status'] == 'success'
+
+
+def test_outstanding_ranges_are_cancelled_once_max_chars_is_reached(monkeypatch):
+    # One thread worker runs the ranges in order; later ranges are slow, so the
+    # ones still queued when the text is long enough can be cancelled
+    started = []
+    lock = threading.Lock()
+    extract_pages = pdf_ingest._extract_pages
+
+    def recording_extract(data, start, stop, max_chars):
+        with lock:
+            started.append(start)
+        if start >= 4:
+            time.sleep(0.05)
+        return extract_pages(data, start, stop, max_chars)
+
+    executor = ThreadPoolExecutor(max_workers=1)
+    monkeypatch.setattr(pdf_ingest, '_get_pool', lambda max_workers=None: executor)
+    monkeypatch.setattr(pdf_ingest, '_extract_pages', recording_extract)
+    pages = [f'Page {number} ' + 'x' * 40 for number in range(20)]
+    try:
+        max_chars = len('\n'.join(pages[:5]))
+        results = list(iter_parse_pdfs([('big.pdf', make_pdf(pages))], max_chars=max_chars, pages_per_task=2))
+    finally:
+        executor.shutdown(wait=True)
+
+    assert results[0]['content'] == '\n'.join(pages[:5])
+    # Ranges 0, 2 and 4 hold the text; at most the range already running after them starts
+    assert started[:3] == [0, 2, 4]
+    assert len(started) <= 4
+
+
+def test_cached_files_are_not_parsed_again(monkeypatch):
+    cache = PdfParseCache()
+    data = make_pdf(PAGES[:2])
+    first = list(iter_parse_pdfs([('a.pdf', data)], cache=cache))
+    assert len(cache) == 1
+
+    def no_pool(max_workers=None):
+        raise AssertionError('a cached file was sent to the pool')
+
+    monkeypatch.setattr(pdf_ingest, '_get_pool', no_pool)
+    # The same bytes under another name are a hit; the result takes the new name
+    again = list(iter_parse_pdfs([('b.pdf', data)], cache=cache))
+    assert again[0]['url'] == 'uploaded://b.pdf'
+    assert again[0]['content'] == first[0]['content']
+
+
+def test_cache_is_keyed_by_max_chars():
+    cache = PdfParseCache()
+    digest = PdfParseCache.digest(b'pdf')
+    cache.put(digest, 100, 'short')
+    assert cache.get(digest, 100) == 'short'
+    assert cache.get(digest, None) is None
+
+
+def test_cache_evicts_least_recently_used_by_entries_and_chars():
+    cache = PdfParseCache(max_entries=2, max_chars=10)
+    cache.put('a', None, 'aaa')
+    cache.put('b', None, 'bbb')
+    cache.get('a', None)
+    cache.put('c', None, 'ccc')
+    assert cache.get('b', None) is None
+    assert cache.get('a', None) == 'aaa' and cache.get('c', None) == 'ccc'
+
+    # 'a' (3) + 'c' (3) + 8 is over 10 characters: both older entries go
+    cache.put('d', None, 'd' * 8)
+    assert len(cache) == 1 and cache.get('d', None) == 'd' * 8
+    # Replacing an entry does not count its old text
+    cache.put('d', None, 'e' * 9)
+    assert cache.get('d', None) == 'e' * 9 and cache._chars == 9
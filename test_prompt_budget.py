@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Offline tests of prompt budgeting, using the four-characters-per-token
+estimate so no tiktoken encoding is needed
+
+    python -m pytest test_prompt_budget.py
+"""
+
+import pytest
+
+import prompt_budget
+from prompt_budget import MESSAGE_OVERHEAD, PromptBudget, TokenCounter, pack
+
+
+@pytest.fixture
+def counter(monkeypatch):
+    monkeypatch.setattr(prompt_budget, '_load_encoding', lambda model: None)
+    counter = TokenCounter()
+    assert not counter.exact
+    return counter
+
+
+def message(role, tokens):
+    # Exactly `tokens` estimated tokens of content
+    return {'role': role, 'content': 'x' * (4 * tokens)}
+
+
+def test_fallback_estimate_rounds_up(counter):
+    assert counter.count('') == 0
+    assert counter.count('abcd') == 1
+    assert counter.count('abcde') == 2
+    assert counter.count_message(message('user', 3)) == 3 + MESSAGE_OVERHEAD
+
+
+def test_fit_history_drops_oldest_pairs_first(counter):
+    history = [message('user', 10), message('assistant', 10),
+               message('user', 20), message('assistant', 20),
+               message('user', 5), message('assistant', 5)]
+    per_message = lambda tokens: tokens + MESSAGE_OVERHEAD
+    budget = PromptBudget(history_tokens=per_message(20) * 2 + per_message(5) * 2)
+
+    fitted, tokens = budget.fit_history(history, counter)
+    assert fitted == history[2:]
+    assert tokens == budget.history_tokens
+
+    # A smaller budget drops whole pairs, never half of one
+    budget.history_tokens -= 1
+    fitted, tokens = budget.fit_history(history, counter)
+    assert fitted == history[4:]
+    assert tokens == per_message(5) * 2
+
+
+def test_fit_history_limits_messages(counter):
+    history = [message('user', 1), message('assistant', 1)] * 4
+    budget = PromptBudget()
+    assert budget.fit_history(history, counter, max_messages=4)[0] == history[-4:]
+    assert budget.fit_history(history, counter, max_messages=0) == ([], 0)
+
+
+def test_fit_history_can_drop_everything(counter):
+    budget = PromptBudget(history_tokens=5)
+    assert budget.fit_history([message('user', 50)], counter) == ([], 0)
+
+
+def test_pack_skips_texts_that_do_not_fit(counter):
+    texts = ['x' * 40, 'x' * 400, 'x' * 20, 'x' * 60]
+    # 10 + 5 tokens fit; the 100-token text is skipped, not the end of packing
+    assert pack(texts, counter, 25) == ([0, 2], 15)
+    assert pack(texts, counter, 30) == ([0, 2, 3], 30)
+    assert pack(texts, counter, 0) == ([], 0)
+    assert pack(texts, counter, 1000) == ([0, 1, 2, 3], 130)
+
+
+def test_content_allowance_is_capped_by_window_and_content_budget():
+    budget = PromptBudget(context_window=1000, answer_tokens=200, content_tokens=400, safety_margin=100)
+    assert budget.content_allowance(100) == 400
+    # 1000 - 200 - 100 - 500 = 200 left in the window
+    assert budget.content_allowance(500) == 200
+    assert budget.content_allowance(900) == 0
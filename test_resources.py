@@ -0,0 +1,25 @@
+#!/usr/bin/env python3
+"""
+Offline tests of the process-wide shared resources (no requests are made)
+
+    python -m pytest test_resources.py
+"""
+
+import resources
+from resources import MAX_OPENAI_CLIENTS, get_openai_client
+
+
+def test_openai_clients_are_shared_per_key_and_bounded(monkeypatch):
+    monkeypatch.setattr(resources, '_openai_clients', type(resources._openai_clients)())
+    first = get_openai_client('sk-first')
+    assert get_openai_client('sk-first') is first
+    local = get_openai_client('sk-first', base_url='http://localhost:1/v1')
+    assert local is not first
+
+    for number in range(MAX_OPENAI_CLIENTS):
+        get_openai_client(f'sk-typo-{number}')
+        # Using the first key keeps it from being evicted
+        assert get_openai_client('sk-first') is first
+    assert len(resources._openai_clients) == MAX_OPENAI_CLIENTS
+    # The least recently used client was dropped
+    assert get_openai_client('sk-first', base_url='http://localhost:1/v1') is not local
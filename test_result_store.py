@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Offline tests of the result stores
+
+    python -m pytest test_result_store.py
+"""
+
+import gc
+import os
+
+import pytest
+
+from result_store import JsonlResultStore, MemoryResultStore, ResultStore, SqliteResultStore
+
+
+def result(number, text='page text', **extra):
+    item = {'url': f'https://a.test/{number}', 'title': f'Page {number}', 'status': 'success',
+            'content': text, 'length': len(text), 'links': ['https://a.test/next']}
+    item.update(extra)
+    return item
+
+
+@pytest.fixture(params=['memory', 'sqlite', 'jsonl'])
+def store(request, tmp_path):
+    if request.param == 'memory':
+        store = MemoryResultStore()
+    elif request.param == 'sqlite':
+        store = SqliteResultStore(directory=str(tmp_path))
+    else:
+        store = JsonlResultStore(str(tmp_path / 'results.jsonl'))
+    yield store
+    store.close()
+
+
+def test_base_class_is_abstract():
+    with pytest.raises(TypeError):
+        ResultStore()
+
+
+def test_replacing_a_result_keeps_its_position(store):
+    store.extend([result(1), result(2), result(3)])
+    store.append(result(2, 'new text'))
+    assert [item['url'] for item in store] == [f'https://a.test/{n}' for n in (1, 2, 3)]
+    assert store.get('https://a.test/2')['content'] == 'new text'
+    assert len(store) == 3
+    assert [summary['preview'] for summary in store.summaries()] == ['page text', 'new text', 'page text']
+
+
+def test_summaries_leave_out_text_and_links(store):
+    store.append(result(1, 'x' * 1000, depth=2, duplicate_of='https://a.test/0'))
+    summary, = store.summaries()
+    assert summary['link_count'] == 1 and summary['depth'] == 2
+    assert summary['duplicate_of'] == 'https://a.test/0'
+    assert len(summary['preview']) < 1000 and 'links' not in summary
+
+
+def test_generators_are_consumed_in_batches_and_iterated_in_order(store):
+    # More results than one write batch (16) and one read batch (64)
+    store.extend(result(number) for number in range(150))
+    assert [item['title'] for item in store] == [f'Page {number}' for number in range(150)]
+    assert 'https://a.test/149' in store and 'https://a.test/150' not in store
+    store.clear()
+    assert not store and list(store) == []
+
+
+def test_jsonl_store_reindexes_on_reopen(tmp_path):
+    path = str(tmp_path / 'results.jsonl')
+    store = JsonlResultStore(path)
+    store.extend([result(1), result(2, 'Café')])
+    store.append(result(1, 'replaced'))
+    store.close()
+
+    reopened = JsonlResultStore(path)
+    assert [item['content'] for item in reopened] == ['replaced', 'Café']
+    assert reopened.get('https://a.test/1')['content'] == 'replaced'
+    reopened.close()
+
+
+def test_temporary_sqlite_file_is_removed(tmp_path):
+    store = SqliteResultStore(directory=str(tmp_path))
+    store.append(result(1))
+    path = store.path
+    assert os.path.exists(path)
+    store.close()
+    assert not os.path.exists(path)
+
+    # ...also when an unclosed store is garbage collected
+    store = SqliteResultStore(directory=str(tmp_path))
+    del store
+    gc.collect()
+    assert os.listdir(tmp_path) == []
+
+
+def test_sqlite_store_with_a_path_is_kept(tmp_path):
+    path = str(tmp_path / 'kept.sqlite')
+    store = SqliteResultStore(path)
+    store.append(result(1))
+    store.close()
+    reopened = SqliteResultStore(path)
+    assert reopened.get('https://a.test/1')['title'] == 'Page 1'
+    reopened.close()
@@ -0,0 +1,32 @@
+#!/usr/bin/env python3
+"""
+Offline tests of the BM25 index
+
+    python -m pytest test_retrieval.py
+"""
+
+from retrieval import BM25Index
+
+
+def _page(url, text):
+    return {'url': url, 'title': url, 'status': 'success', 'content': text}
+
+
+def test_bm25_add_and_remove_pages():
+    index = BM25Index()
+    index.add_page(_page('https://a.test/py', 'python snakes and python code'))
+    index.add_page(_page('https://a.test/go', 'go gophers write code'))
+    assert [hit['url'] for hit in index.search('python')] == ['https://a.test/py']
+    assert {hit['url'] for hit in index.search('code')} == {'https://a.test/py', 'https://a.test/go'}
+
+    index.remove_page('https://a.test/py')
+    assert index.search('python') == []
+    assert [hit['url'] for hit in index.search('code')] == ['https://a.test/go']
+    assert len(index) == 1
+
+    # Re-adding a page replaces its chunks instead of duplicating them
+    index.add_page(_page('https://a.test/go', 'go gophers'))
+    index.add_page(_page('https://a.test/go', 'go gophers'))
+    assert len(index) == 1
+    index.remove_page('https://a.test/go')
+    assert len(index) == 0 and index._total_length == 0 and not index._postings
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Offline scraper tests against a local HTTP server (no internet needed)
+
+    python -m pytest test_scraper_offline.py
+"""
+
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from async_scraper import AsyncWebScraper, aiohttp
+from crawl_state import CrawlStateStore
+from http_cache import ResponseCache
+from scraper import WebScraper
+
+# aiohttp is optional (see README); the async tests are skipped without it
+requires_aiohttp = pytest.mark.skipif(aiohttp is None, reason="aiohttp is not installed")
+
+PAGES = {
+    '/': b'<html><head><title>Home</title></head><body><a href="/p1.html">One</a> Welcome home</body></html>',
+    '/p1.html': b'<html><head><title>Page one</title></head><body>First page text</body></html>',
+    # Charset only in the Content-Type header, and not declared at all
+    '/latin1.html': '<html><head><title>Café Müller</title></head><body>Café Müller</body></html>'.encode('iso-8859-1'),
+    '/cp1252.html': '<html><head><title>Café Müller</title></head><body>Café Müller – Straße</body></html>'.encode('windows-1252'),
+    # Served with an ETag; a matching If-None-Match gets a bare 304
+    '/etag.html': '<html><head><title>Grüße</title></head><body>Cached page</body></html>'.encode('iso-8859-1'),
+}
+CONTENT_TYPES = {
+    '/latin1.html': 'text/html; charset=ISO-8859-1',
+    '/cp1252.html': 'text/html',
+    '/etag.html': 'text/html; charset=ISO-8859-1',
+}
+ETAGS = {'/etag.html': '"v1"'}
+# Status codes sent per path, to check what the cache revalidated
+RESPONSES = {}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        path = self.path.split('?')[0]
+        path = path if path == '/' else path.rstrip('/')
+        body = PAGES.get(path)
+        if body is None:
+            self.send_response(404)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        etag = ETAGS.get(path)
+        if etag is not None and self.headers.get('If-None-Match') == etag:
+            RESPONSES.setdefault(path, []).append(304)
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return
+        RESPONSES.setdefault(path, []).append(200)
+        self.send_response(200)
+        if etag is not None:
+            self.send_header('ETag', etag)
+        self.send_header('Content-Type', CONTENT_TYPES.get(path, 'text/html; charset=utf-8'))
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@pytest.fixture(scope='module')
+def base_url():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{server.server_address[1]}'
+    server.shutdown()
+    server.server_close()
+
+
+def make_scraper():
+    return WebScraper(delay=0, respect_robots=False)
+
+
+def test_scrape_multiple_urls_accepts_unnormalized_urls(base_url):
+    # Bare host, trailing slash, fragment and upper-case scheme all change under normalization
+    urls = [base_url, f'{base_url}/p1.html/', f'{base_url}/p1.html#top',
+            base_url.replace('http://', 'HTTP://') + '/p1.html']
+    results = make_scraper().scrape_multiple_urls(urls)
+
+    assert len(results) == len(urls)
+    assert all(result['status'] == 'success' for result in results)
+    assert results[0]['url'] == f'{base_url}/'
+    assert {result['url'] for result in results[1:]} == {f'{base_url}/p1.html'}
+    assert results[1]['title'] == 'Page one'
+
+
+def test_scrape_multiple_urls_keeps_input_order_and_duplicates(base_url):
+    urls = [f'{base_url}/p1.html', base_url, f'{base_url}/p1.html']
+    results = make_scraper().scrape_multiple_urls(urls)
+    assert [result['title'] for result in results] == ['Page one', 'Home', 'Page one']
+
+
+def test_iter_scrape_multiple_urls_yields_each_url_once(base_url):
+    urls = [base_url, f'{base_url}/p1.html', base_url]
+    results = list(make_scraper().iter_scrape_multiple_urls(urls))
+    assert len(results) == 2
+
+
+def test_missing_page_is_an_error_result(base_url):
+    result = make_scraper().scrape_url(f'{base_url}/missing')
+    assert result['status'].startswith('error')
+
+
+def test_header_charset_decodes_page(base_url):
+    result = make_scraper().scrape_url(f'{base_url}/latin1.html')
+    assert result['title'] == 'Café Müller'
+    assert 'Café Müller' in result['content']
+
+
+def test_undeclared_charset_is_detected(base_url):
+    result = make_scraper().scrape_url(f'{base_url}/cp1252.html')
+    assert result['title'] == 'Café Müller'
+    assert 'Café Müller – Straße' in result['content']
+
+
+def test_stopped_crawl_can_be_resumed(base_url, tmp_path):
+    state_store = CrawlStateStore(path=str(tmp_path / 'crawl_state.sqlite'))
+    scraper = WebScraper(delay=0, respect_robots=False, max_workers=1, state_store=state_store)
+    pages = scraper.iter_scrape_with_depth([base_url], depth=1)
+    first = next(pages)
+    pages.close()
+    assert [crawl['crawl_id'] for crawl in state_store.unfinished_crawls()] == [scraper.crawl_id]
+
+    resumed = WebScraper(delay=0, respect_robots=False, state_store=state_store)
+    results = list(resumed.iter_resume(scraper.crawl_id))
+    assert results[0]['url'] == first['url']
+    assert {result['title'] for result in results} == {'Home', 'Page one'}
+    assert state_store.unfinished_crawls() == []
+    state_store.close()
+
+
+def test_not_modified_response_reuses_cached_body_and_charset(base_url, tmp_path):
+    cache = ResponseCache(path=str(tmp_path / 'http_cache.sqlite'))
+    scraper = WebScraper(delay=0, respect_robots=False, cache=cache)
+    RESPONSES.pop('/etag.html', None)
+    first = scraper.scrape_url(f'{base_url}/etag.html')
+    second = scraper.scrape_url(f'{base_url}/etag.html')
+
+    assert RESPONSES['/etag.html'] == [200, 304]
+    assert first['title'] == second['title'] == 'Grüße'
+    assert second['content'] == first['content']
+    cache.close()
+
+
+@requires_aiohttp
+def test_async_scrape_multiple_urls(base_url):
+    async def scrape():
+        async with AsyncWebScraper(delay=0, respect_robots=False) as scraper:
+            return await scraper.scrape_multiple_urls(
+                [f'{base_url}/p1.html', base_url, f'{base_url}/p1.html#top', f'{base_url}/missing'])
+
+    results = asyncio.run(scrape())
+    assert [result['title'] for result in results[:3]] == ['Page one', 'Home', 'Page one']
+    assert results[3]['status'].startswith('error')
+
+
+@requires_aiohttp
+def test_async_scrape_with_depth_follows_links(base_url):
+    async def crawl():
+        async with AsyncWebScraper(delay=0, respect_robots=False, max_pages=10) as scraper:
+            return await scraper.scrape_with_depth([base_url], depth=1)
+
+    results = asyncio.run(crawl())
+    assert {(result['url'], result['depth']) for result in results} == {
+        (f'{base_url}/', 0), (f'{base_url}/p1.html', 1)}
+    assert all(result['status'] == 'success' for result in results)
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+Offline tests of URL normalization
+
+    python -m pytest test_url_utils.py
+"""
+
+import pytest
+
+from url_utils import normalize_url, site_key, strip_www
+
+
+def test_strip_www_removes_a_prefix_not_characters():
+    # lstrip('www.') would have turned these into 'eb.com' and 'ow.com'
+    assert strip_www('web.com') == 'web.com'
+    assert strip_www('www.wow.com') == 'wow.com'
+    assert strip_www('wow.com') == 'wow.com'
+
+
+@pytest.mark.parametrize('url, expected', [
+    ('https://web.com/page', 'https://web.com/page'),
+    ('https://www.wow.com/', 'https://wow.com/'),
+    ('HTTPS://Example.COM', 'https://example.com/'),
+    ('http://example.com:80/a/', 'http://example.com/a'),
+    ('https://example.com:443/a#section', 'https://example.com/a'),
+    ('https://example.com:8443/a', 'https://example.com:8443/a'),
+])
+def test_normalize_url(url, expected):
+    assert normalize_url(url) == expected
+
+
+def test_tracking_params_are_dropped_and_order_kept():
+    url = 'https://example.com/p?b=2&utm_source=news&a=1&gclid=x&fbclid=y&UTM_MEDIUM=mail'
+    assert normalize_url(url) == 'https://example.com/p?b=2&a=1'
+
+
+@pytest.mark.parametrize('url', [
+    'https://www.Example.com:443/path/?q=1&utm_campaign=x#top',
+    'http://web.com',
+    'https://example.com/a%20b?x=&y=1',
+])
+def test_normalization_is_idempotent(url):
+    once = normalize_url(url)
+    assert normalize_url(once) == once
+
+
+def test_site_key_ignores_www():
+    assert site_key('https://www.example.com/a') == site_key('http://EXAMPLE.com/b') == 'example.com'
+    assert site_key('https://web.com') == 'web.com'
@@ -0,0 +1,57 @@
+from functools import lru_cache
+from urllib.parse import urlparse, urlunparse, parse_qsl, urlencode
+
+# Query parameters that only track the visitor and never change page content
+TRACKING_PARAMS = frozenset([
+    'utm_source', 'utm_medium', 'utm_campaign', 'utm_term', 'utm_content', 'gclid', 'fbclid'
+])
+
+# Crawls see the same hrefs on every page, so a bounded cache avoids re-parsing them
+NORMALIZE_CACHE_SIZE = 65536
+
+
+def strip_www(hostname: str) -> str:
+    """Drop a leading 'www.' label (a prefix, not a character set)"""
+    return hostname[4:] if hostname.startswith('www.') else hostname
+
+
+@lru_cache(maxsize=NORMALIZE_CACHE_SIZE)
+def normalize_url(url: str) -> str:
+    """Normalize URLs for consistent comparison and storage.
+    - Lowercase scheme and host
+    - Remove fragment
+    - Remove default ports
+    - Strip common tracking query params
+    - Remove trailing slash (except root)
+    """
+    try:
+        parsed = urlparse(url)
+        scheme = parsed.scheme.lower()
+        # Drop leading www. for same-site comparisons
+        hostname = strip_www((parsed.hostname or '').lower())
+        port = parsed.port
+        # Remove default ports
+        netloc = hostname
+        if port and not ((scheme == 'http' and port == 80) or (scheme == 'https' and port == 443)):
+            netloc = f"{hostname}:{port}"
+
+        # Clean query: drop tracking params, keep original order
+        query = ''
+        if parsed.query:
+            query = urlencode([(k, v) for k, v in parse_qsl(parsed.query, keep_blank_values=True)
+                               if k.lower() not in TRACKING_PARAMS])
+
+        # Normalize path: remove trailing slash except root
+        path = parsed.path or '/'
+        if len(path) > 1 and path.endswith('/'):
+            path = path.rstrip('/')
+
+        return urlunparse((scheme, netloc, path, '', query, ''))
+    except Exception:
+        return url
+
+
+@lru_cache(maxsize=NORMALIZE_CACHE_SIZE)
+def site_key(url: str) -> str:
+    """Host used for same-site checks, tolerant of a leading www."""
+    return strip_www((urlparse(url).hostname or '').lower())